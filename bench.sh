@@ -0,0 +1 @@
+python src/benchmark.py "$@"
\ No newline at end of file
@@ -0,0 +1,695 @@
+import argparse
+import gzip
+import io
+import json
+import os
+import operator
+import platform
+import sys
+import tempfile
+import timeit
+import tracemalloc
+
+from blocks import (
+    markdown_batch_to_html,
+    markdown_to_html_node,
+    render_inline,
+    set_inline_memo,
+    write_markdown_html,
+)
+from build import build_site, find_content
+from htmlnode import (
+    LeafNode,
+    ParentNode,
+    chained_text_to_textnodes,
+    split_nodes_delimiter,
+    split_nodes_image,
+    split_nodes_link,
+    text_node_to_html_node,
+    text_nodes_to_html_nodes,
+    text_to_children,
+    text_to_textnodes,
+)
+from rendercache import MemoCache
+from textnode import TextNode, TextType
+from textspans import TextSpans
+from watch import SiteRebuilder, open_watcher
+
+
+# Sentences the synthetic corpora are built from, one per corpus shape
+SHAPES = {
+    "mixed": (
+        "This is **bold** and _italic_ with `some code` plus an"
+        " ![image](https://example.com/img.png) and a [link](https://boot.dev). "
+    ),
+    "prose": (
+        "Most of this sentence is plain text that runs on for a while, with"
+        " only the occasional **bold** word to break it up. "
+    ),
+    "code": "Call `parse(text)` then `render(node)` and check `result.ok` or `result.error`. ",
+    "links": (
+        "See [the guide](https://boot.dev/guide) and [the API](https://boot.dev/api)"
+        " next to ![a diagram](https://example.com/diagram.png). "
+    ),
+}
+
+# Set from the command line: corpus sizes are multiplied by SCALE and
+# paragraphs are built from the SHAPE sentence
+SCALE = 1.0
+SHAPE = "mixed"
+
+# Every measurement of the run, keyed by "group: label"
+RESULTS = {}
+_current_group = None
+
+
+def scaled(size):
+    return max(1, int(size * SCALE))
+
+
+def best_time(func, repeat=5, min_time=0.005, budget=0.25):
+    # Best of several runs is the least noisy figure for CPU-bound code. A
+    # function quicker than min_time is called enough times per run to
+    # take that long, as one call of a few microseconds times mostly the
+    # timer. Runs go on past repeat until budget seconds were spent, so
+    # the best is unlikely to come from a stretch when the machine was
+    # busy with something else
+    timer = timeit.Timer(func)
+    number = 1
+    while (seconds := timer.timeit(number)) < min_time:
+        number *= max(2, min(10, int(min_time / max(seconds, 1e-9))))
+    times = [seconds]
+    while len(times) < repeat or sum(times) < budget:
+        times.append(timer.timeit(number))
+    return min(times) / number
+
+
+def record(label, value, unit, reference=False):
+    # A reference measurement times a baseline kept only for comparison,
+    # such as an old implementation, so --compare doesn't gate on it
+    result = {"value": value, "unit": unit}
+    if reference:
+        result["reference"] = True
+    RESULTS[f"{_current_group}: {label}"] = result
+
+
+def report(label, seconds, reference=False):
+    record(label, seconds, "s", reference)
+    print(f"{label:<48} {seconds * 1000:10.2f} ms")
+
+
+def report_memory(label, size, reference=False):
+    record(label, size, "bytes", reference)
+    print(f"{label:<48} {size / 1024 / 1024:10.2f} MB")
+
+
+def report_count(label, count, reference=False):
+    record(label, count, "count", reference)
+    print(f"{label:<48} {count:10d}")
+
+
+def long_paragraph(sentences, shape=None):
+    return SHAPES[shape or SHAPE] * sentences
+
+
+def bench_hot_paths():
+    # Each parsing and rendering stage on its own, over the chosen corpus
+    text = long_paragraph(scaled(2000))
+    text_node = TextNode(text, TextType.TEXT)
+    text_nodes = text_to_textnodes(text)
+    html_nodes = text_nodes_to_html_nodes(text_nodes)
+    page = ParentNode("div", [ParentNode("p", html_nodes[index:index + 20]) for index in range(0, len(html_nodes), 20)])
+    document = "\n\n".join(f"## Section {index}\n\n{long_paragraph(10)}" for index in range(scaled(200)))
+    cases = (
+        ("split_nodes_delimiter", lambda: split_nodes_delimiter([text_node], "`", TextType.CODE)),
+        ("split_nodes_image", lambda: split_nodes_image([text_node])),
+        ("split_nodes_link", lambda: split_nodes_link([text_node])),
+        ("text_to_textnodes", lambda: text_to_textnodes(text)),
+        ("text_node_to_html_node", lambda: [text_node_to_html_node(node) for node in text_nodes]),
+        ("text_to_children", lambda: text_to_children(text)),
+        ("ParentNode.to_html", page.to_html),
+        ("whole document to HTML", lambda: markdown_to_html_node(document).to_html()),
+    )
+    for name, func in cases:
+        report(name, best_time(func))
+
+
+def bench_inline_tokenizer():
+    for sentences in (scaled(100), scaled(1000), scaled(5000)):
+        text = long_paragraph(sentences)
+        chained = best_time(lambda: chained_text_to_textnodes(text))
+        tokenized = best_time(lambda: text_to_textnodes(text))
+        report(f"split_nodes_* chain, {sentences} sentences", chained, reference=True)
+        report(f"text_to_textnodes, {sentences} sentences", tokenized)
+        print(f"{'speedup':<48} {chained / tokenized:10.1f} x")
+        two_step = best_time(lambda: text_nodes_to_html_nodes(text_to_textnodes(text)))
+        fused = best_time(lambda: text_to_children(text))
+        report(f"tokenize then convert, {sentences} sentences", two_step)
+        report(f"text_to_children, {sentences} sentences", fused)
+        print(f"{'speedup':<48} {two_step / fused:10.1f} x")
+
+
+def bench_delimiter_pathological():
+    # Roughly 1 MB of back-to-back inline code spans, the shape of generated
+    # API reference paragraphs; runtime must grow linearly with the size
+    span = "`value` and "
+    for size in (scaled(256 * 1024), scaled(512 * 1024), scaled(1024 * 1024)):
+        text = span * (size // len(span))
+        node = TextNode(text, TextType.TEXT)
+        seconds = best_time(lambda: split_nodes_delimiter([node], "`", TextType.CODE), 3)
+        report(f"split_nodes_delimiter, {size // 1024} KB paragraph", seconds)
+
+
+def bench_brackets_pathological():
+    # Unclosed and nested brackets, which a backtracking matcher rescans;
+    # the time per KB must stay flat as the paragraph grows
+    patterns = {
+        "unclosed [": "[",
+        "unclosed ![": "![",
+        "unclosed [a](": "[a](",
+        "nested links": "[a [b](/c) d](/e) ",
+    }
+    for name, pattern in patterns.items():
+        for size in (scaled(64 * 1024), scaled(256 * 1024)):
+            text = pattern * (size // len(pattern))
+            seconds = best_time(lambda: text_to_textnodes(text), 3)
+            report(f"text_to_textnodes, {name} x {size // 1024} KB", seconds)
+
+
+def concat_to_html(node):
+    # The string-concatenating recursive renderer to_html used to be
+    if isinstance(node, LeafNode):
+        return node.to_html()
+    childs = ""
+    for child in node.children:
+        childs += concat_to_html(child)
+    return f"<{node.tag}{node.props_to_html()}>{childs}</{node.tag}>"
+
+
+def recursive_write_html(node, stream):
+    # The recursive renderer write_html used before the explicit-stack walk
+    if isinstance(node, LeafNode):
+        stream.write(node.to_html())
+        return
+    stream.write(f"<{node.tag}{node.props_to_html()}>")
+    for child in node.children:
+        recursive_write_html(child, stream)
+    stream.write(f"</{node.tag}>")
+
+
+def deep_tree(depth):
+    node = LeafNode("span", "leaf")
+    for _ in range(depth):
+        node = ParentNode("div", [node])
+    return node
+
+
+def wide_tree(width):
+    return ParentNode("ul", [
+        ParentNode("li", [LeafNode(None, "item "), LeafNode("b", str(index))])
+        for index in range(width)
+    ])
+
+
+def nested_page(sections, depth):
+    # A page of sections, each wrapping its paragraph in `depth` divs
+    sections_nodes = []
+    for index in range(sections):
+        node = ParentNode("p", [
+            LeafNode(None, "Some paragraph text with "),
+            LeafNode("a", f"link {index}", {"href": f"/page/{index}"}),
+        ])
+        for _ in range(depth):
+            node = ParentNode("div", [node], {"class": "wrapper"})
+        sections_nodes.append(node)
+    return ParentNode("main", sections_nodes)
+
+
+def bench_render():
+    for sections, depth in ((scaled(2000), 5), (scaled(200), 100)):
+        page = nested_page(sections, depth)
+        concat = best_time(lambda: concat_to_html(page))
+        streamed = best_time(page.to_html)
+        label = f"{sections} sections x {depth} deep"
+        report(f"concatenating to_html, {label}", concat, reference=True)
+        report(f"streaming to_html, {label}", streamed)
+
+
+def bench_render_depth():
+    # The recursive reference needs headroom to reach 10k levels at all
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 50000))
+    size = scaled(10000)
+    for label, tree in ((f"{size}-deep", deep_tree(size)), (f"{size}-wide", wide_tree(size))):
+        recursive = best_time(lambda: recursive_write_html(tree, io.StringIO()))
+        iterative = best_time(lambda: tree.write_html(io.StringIO()))
+        report(f"recursive write_html, {label} tree", recursive, reference=True)
+        report(f"explicit-stack write_html, {label} tree", iterative)
+
+
+class DictTextNode:
+    # TextNode as it was before __slots__, for comparison
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+class DictLeafNode:
+    # LeafNode as it was before __slots__, for comparison
+    def __init__(self, tag, value, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = None
+        self.props = props
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_node_memory():
+    nodes = text_to_textnodes(long_paragraph(scaled(20000)))
+    leaves = [text_node_to_html_node(node) for node in nodes]
+    cases = (
+        ("TextNode", TextNode, DictTextNode, nodes, ("text", "text_type", "url")),
+        ("LeafNode", LeafNode, DictLeafNode, leaves, ("tag", "value", "props")),
+    )
+    for label, slotted, unslotted, source, fields in cases:
+        args = list(map(operator.attrgetter(*fields), source))
+        for name, cls in (("dict-based", unslotted), ("slotted", slotted)):
+            reference = cls is unslotted
+            memory = peak_memory(lambda: [cls(*arg) for arg in args])
+            report_memory(f"{len(args)} {name} {label}s, peak", memory, reference)
+            copies = [cls(*arg) for arg in args]
+            read = operator.attrgetter(fields[0])
+            seconds = best_time(lambda: list(map(read, copies)))
+            report(f"{name} {label} attribute access", seconds, reference)
+
+
+def match_text_node_to_html_node(text_node):
+    # The match-based converter text_node_to_html_node used to be
+    match text_node.text_type:
+        case TextType.TEXT:
+            return LeafNode(None, text_node.text)
+        case TextType.BOLD:
+            return LeafNode("b", text_node.text)
+        case TextType.ITALIC:
+            return LeafNode("i", text_node.text)
+        case TextType.CODE:
+            return LeafNode("code", text_node.text)
+        case TextType.LINK:
+            return LeafNode("a", text_node.text, {"href": text_node.url})
+        case TextType.IMAGE:
+            return LeafNode("img", "", {"src": text_node.url, "alt": text_node.text})
+        case _:
+            raise ValueError(f"Invalid TextType: {text_node.text_type}")
+
+
+def bench_text_node_conversion():
+    nodes = text_to_textnodes(long_paragraph(scaled(100000)))
+    label = f"{len(nodes) // 1000}k nodes"
+    cases = (
+        ("match per node", lambda: [match_text_node_to_html_node(node) for node in nodes], True),
+        ("text_node_to_html_node per node", lambda: [text_node_to_html_node(node) for node in nodes], False),
+        ("text_nodes_to_html_nodes batch", lambda: text_nodes_to_html_nodes(nodes), False),
+    )
+    for name, func, reference in cases:
+        report(f"{name}, {label}", best_time(func, 3), reference)
+
+    # The same boilerplate links and badges on every page, converted and
+    # rendered per page, from fresh TextNodes or from interned ones
+    pages = scaled(1000)
+    boilerplate = [TextNode(f"Section {index}", TextType.LINK, f"/section{index}/") for index in range(40)]
+    boilerplate += [TextNode(f"badge {index}", TextType.IMAGE, f"/badges/{index}.svg") for index in range(10)]
+    interned = [node.freeze() for node in boilerplate]
+    for name, nodes in (("fresh", boilerplate), ("interned", interned)):
+        def render_pages():
+            for _ in range(pages):
+                ParentNode("nav", text_nodes_to_html_nodes(nodes)).to_html()
+
+        report(f"boilerplate on {pages} pages, {name} TextNodes", best_time(render_pages))
+
+
+def bench_inline_memo():
+    # Generated docs: each page repeats the same boilerplate paragraphs and
+    # link list around one paragraph of its own
+    pages = scaled(1000)
+    boilerplate = "\n\n".join(long_paragraph(2) + f"Note {index}." for index in range(8))
+    links = "\n".join(f"- [Section {index}](/section{index}/)" for index in range(30))
+    documents = [
+        f"# Page {index}\n\n{boilerplate}\n\nPage {index} has **its own** text.\n\n{links}"
+        for index in range(pages)
+    ]
+    report(f"{pages} pages, no memo", best_time(lambda: markdown_batch_to_html(documents), 3))
+    for max_entries in (None, 64):
+        memo = MemoCache(render_inline, max_entries=max_entries)
+        previous = set_inline_memo(memo)
+        try:
+            seconds = best_time(lambda: markdown_batch_to_html(documents), 3)
+        finally:
+            set_inline_memo(previous)
+        report(f"{pages} pages, memo of {max_entries or 'unbounded'} entries", seconds)
+        print(f"{'hit rate':<48} {memo.stats()['hit_rate']:10.2f}")
+
+
+def write_corpus(content_dir, pages, paragraphs=5):
+    for index in range(pages):
+        path = os.path.join(content_dir, f"section{index % 50}", f"page{index}.md")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(f"# Page {index}\n\n")
+            file.write("\n\n".join([long_paragraph(3)] * paragraphs))
+
+
+def bench_incremental_build():
+    pages = scaled(5000)
+    with tempfile.TemporaryDirectory() as root:
+        content_dir = os.path.join(root, "content")
+        dest_dir = os.path.join(root, "public")
+        write_corpus(content_dir, pages)
+        report(f"full build, {pages} pages", best_time(lambda: build_site(content_dir, dest_dir, force=True), 3))
+        report(f"no-op rebuild, {pages} pages", best_time(lambda: build_site(content_dir, dest_dir)))
+        edited = os.path.join(content_dir, "section0", "page0.md")
+
+        def edit_and_rebuild():
+            with open(edited, "a", encoding="utf-8") as file:
+                file.write("\n\nEdited.")
+            build_site(content_dir, dest_dir)
+
+        report(f"one-file rebuild, {pages} pages", best_time(edit_and_rebuild))
+
+
+def gzip_outputs(content_dir, dest_dir):
+    # The separate pass the compressed writer replaces: read every page
+    # back and write its .gz
+    for _, output in find_content(content_dir, dest_dir)[0]:
+        with open(output, "rb") as file, gzip.GzipFile(output + ".gz", "wb", mtime=0) as compressed:
+            compressed.write(file.read())
+
+
+def bench_compressed_output():
+    pages = scaled(2000)
+    with tempfile.TemporaryDirectory() as root:
+        content_dir = os.path.join(root, "content")
+        dest_dir = os.path.join(root, "public")
+        write_corpus(content_dir, pages)
+
+        def two_passes():
+            build_site(content_dir, dest_dir, force=True)
+            gzip_outputs(content_dir, dest_dir)
+
+        report(f"build then gzip pass, {pages} pages", best_time(two_passes, 3), reference=True)
+        report(
+            f"compressed build, {pages} pages",
+            best_time(lambda: build_site(content_dir, dest_dir, force=True, compress=("gz",)), 5),
+        )
+        edited = os.path.join(content_dir, "section0", "page0.md")
+
+        def touch_and_rebuild():
+            # New bytes, same HTML: the page is rendered but nothing is written
+            with open(edited, "a", encoding="utf-8") as file:
+                file.write("\n")
+            return build_site(content_dir, dest_dir, compress=("gz",))
+
+        report(f"unchanged-HTML rebuild, {pages} pages", best_time(touch_and_rebuild))
+        report_count("pages rewritten by that rebuild", len(touch_and_rebuild()["built"]))
+
+
+def bench_watch():
+    # Save-to-written latency of watch mode, on a site of 10k pages
+    pages = scaled(10000)
+    with tempfile.TemporaryDirectory() as root:
+        content_dir = os.path.join(root, "content")
+        dest_dir = os.path.join(root, "public")
+        write_corpus(content_dir, pages)
+        rebuilder = SiteRebuilder(content_dir, dest_dir)
+        rebuilder.build()
+        edited = os.path.join(content_dir, "section0", "page0.md")
+
+        def edit():
+            with open(edited, "a", encoding="utf-8") as file:
+                file.write("\n\nEdited.")
+
+        def edit_and_update():
+            edit()
+            rebuilder.update({edited})
+
+        report(f"in-memory page rebuild, {pages} pages", best_time(edit_and_update))
+        for name, polling in (("inotify", False), ("polling", True)):
+            watcher = open_watcher([content_dir], polling)
+
+            def save_to_written():
+                edit()
+                rebuilder.update(watcher.changes())
+
+            report(f"save to written, {type(watcher).__name__}, {pages} pages", best_time(save_to_written))
+            watcher.close()
+
+
+def bench_parallel_build():
+    pages = scaled(4000)
+    with tempfile.TemporaryDirectory() as root:
+        content_dir = os.path.join(root, "content")
+        write_corpus(content_dir, pages, paragraphs=20)
+        serial = None
+        for jobs in (1, 2, 4, 8):
+            dest_dir = os.path.join(root, f"public{jobs}")
+            # Starting the pool is most of a small build, and varies a lot
+            seconds = best_time(lambda: build_site(content_dir, dest_dir, force=True, jobs=jobs), 7)
+            serial = serial or seconds
+            report(f"full build, {pages} pages, {jobs} jobs", seconds)
+            print(f"{'speedup':<48} {serial / seconds:10.1f} x")
+
+
+def bench_block_streaming():
+    # Peak memory of streaming a large changelog versus building its tree
+    with tempfile.TemporaryDirectory() as root:
+        source = os.path.join(root, "changelog.md")
+        with open(source, "w", encoding="utf-8") as file:
+            for index in range(scaled(20000)):
+                file.write(f"## Release {index}\n\n{long_paragraph(1)}\n\n- fixed `bug {index}`\n- added [docs](/docs)\n\n")
+        size = os.path.getsize(source) / 1024 / 1024
+
+        def build_tree():
+            with open(source, encoding="utf-8") as file, open(os.devnull, "w") as out:
+                markdown_to_html_node(file.read()).write_html(out)
+
+        def stream():
+            with open(source, encoding="utf-8") as file, open(os.devnull, "w") as out:
+                write_markdown_html(file, out)
+
+        for name, func in (("whole-document tree", build_tree), ("line-streamed blocks", stream)):
+            report_memory(f"{name}, {size:.0f} MB source, peak", peak_memory(func))
+            report(f"{name}, {size:.0f} MB source", best_time(func, 3))
+
+
+def uncached_props_to_html(node):
+    # props_to_html as it was before the attribute string was cached
+    props_html = ""
+    for prop in node.props:
+        props_html += f' {prop}="{node.props[prop]}"'
+    return props_html
+
+
+def navigation(links):
+    return ParentNode("nav", [
+        ParentNode("ul", [
+            ParentNode("li", [
+                LeafNode("a", f"Section {index}", {
+                    "href": f"/section/{index}/index.html",
+                    "class": "nav-link",
+                    "title": f"Go to section {index}",
+                }),
+            ], {"class": "nav-item"})
+            for index in range(links)
+        ], {"class": "nav-list"}),
+    ], {"class": "site-nav", "aria-label": "Main"})
+
+
+def bench_props():
+    # The same navigation subtree rendered onto every page of a build
+    nav = navigation(50)
+    elements = []
+    pending = [nav]
+    while pending:
+        node = pending.pop()
+        elements.append(node)
+        pending.extend(node.children or [])
+    pages = scaled(1000)
+    uncached = best_time(lambda: [uncached_props_to_html(node) for _ in range(pages) for node in elements])
+    cached = best_time(lambda: [node.props_to_html() for _ in range(pages) for node in elements])
+    report(f"uncached props_to_html, nav on {pages} pages", uncached, reference=True)
+    report(f"cached props_to_html, nav on {pages} pages", cached)
+    report(f"to_html, nav on {pages} pages", best_time(lambda: [nav.to_html() for _ in range(pages)]))
+
+
+def site_chrome():
+    header = ParentNode("header", [LeafNode("h1", "Docs"), navigation(50)], {"class": "site-header"})
+    sidebar = ParentNode("aside", [navigation(100)], {"class": "sidebar"})
+    footer = ParentNode("footer", [
+        LeafNode("p", "Copyright", {"class": "legal"}),
+        navigation(20),
+    ])
+    return header, sidebar, footer
+
+
+def bench_fragment_cache():
+    # A page whose shared template dwarfs its own content
+    content = ParentNode("main", [ParentNode("p", text_nodes_to_html_nodes(text_to_textnodes(long_paragraph(5))))])
+    plain = site_chrome()
+    frozen = [node.freeze() for node in site_chrome()]
+    pages = scaled(500)
+    cases = (("without fragment cache", plain, True), ("with fragment cache", frozen, False))
+    for name, (header, sidebar, footer), reference in cases:
+        page = ParentNode("body", [header, sidebar, content, footer])
+        seconds = best_time(lambda: [page.to_html() for _ in range(pages)])
+        report(f"{name}, per page", seconds / pages, reference)
+
+
+def retained_blocks(func):
+    # Number of memory blocks still held by the result of func
+    tracemalloc.start()
+    try:
+        result = func()
+        snapshot = tracemalloc.take_snapshot()
+        return sum(stat.count for stat in snapshot.statistics("filename")), result
+    finally:
+        tracemalloc.stop()
+
+
+def bench_text_spans():
+    text = long_paragraph(scaled(20000))
+    cases = (
+        ("TextNode lists", lambda: chained_text_to_textnodes(text), True),
+        ("TextSpans arrays", lambda: TextSpans(text).split_inline(), False),
+    )
+    for name, func, reference in cases:
+        report_memory(f"split chain over {name}, peak", peak_memory(func), reference)
+        report_count(f"split chain over {name}, live blocks", retained_blocks(func)[0], reference)
+        report(f"split chain over {name}", best_time(func, 3), reference)
+
+
+def bench_mmap_spans():
+    # A generated reference page far bigger than any paragraph we'd slice
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "reference.md")
+        with open(path, "w", encoding="utf-8") as file:
+            for _ in range(10):
+                file.write(long_paragraph(scaled(10000)))
+        size = os.path.getsize(path) / 1024 / 1024
+
+        def from_str():
+            with open(path, encoding="utf-8") as file:
+                return TextSpans(file.read()).split_inline()
+
+        def from_mmap():
+            with TextSpans.from_file(path) as spans:
+                return len(spans.split_inline())
+
+        for name, func in (("read() into str", from_str), ("mmap'd bytes", from_mmap)):
+            report_memory(f"{name}, {size:.0f} MB file, peak", peak_memory(func))
+            report(f"{name}, {size:.0f} MB file", best_time(func, 3))
+
+
+BENCHMARKS = {
+    "hotpaths": bench_hot_paths,
+    "inline": bench_inline_tokenizer,
+    "delimiter": bench_delimiter_pathological,
+    "brackets": bench_brackets_pathological,
+    "render": bench_render,
+    "depth": bench_render_depth,
+    "memory": bench_node_memory,
+    "convert": bench_text_node_conversion,
+    "incremental": bench_incremental_build,
+    "memo": bench_inline_memo,
+    "compress": bench_compressed_output,
+    "watch": bench_watch,
+    "parallel": bench_parallel_build,
+    "blocks": bench_block_streaming,
+    "props": bench_props,
+    "fragments": bench_fragment_cache,
+    "spans": bench_text_spans,
+    "mmap": bench_mmap_spans,
+}
+
+
+def compare_results(baseline, current, threshold):
+    """
+    Compares two runs' results, as saved by --output.
+
+    Every measurement is lower-is-better, so one counts as a regression
+    when it grew by more than threshold (0.2 meaning 20%) over the
+    baseline. Reference measurements, of the old implementations and
+    stand-ins a benchmark compares against, are listed but never count
+    as regressions. Measurements missing from either run are ignored.
+
+    Returns:
+        A list of (key, baseline value, current value, ratio) tuples for
+        each measurement in both runs, and the list of regressed keys.
+    """
+    changes = []
+    regressions = []
+    for key, result in current.items():
+        previous = baseline.get(key)
+        if previous is None or previous["unit"] != result["unit"] or not previous["value"]:
+            continue
+        ratio = result["value"] / previous["value"]
+        changes.append((key, previous["value"], result["value"], ratio))
+        reference = result.get("reference") or previous.get("reference")
+        if ratio > 1 + threshold and not reference:
+            regressions.append(key)
+    return changes, regressions
+
+
+def main(argv=None):
+    global SCALE, SHAPE, _current_group
+
+    parser = argparse.ArgumentParser(description="Benchmark the parsing and rendering hot paths.")
+    parser.add_argument("names", nargs="*", metavar="BENCHMARK", help=f"benchmarks to run (default: all): {', '.join(BENCHMARKS)}")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every corpus size by this")
+    parser.add_argument("--shape", choices=SHAPES, default="mixed", help="sentence mix of the synthetic corpora")
+    parser.add_argument("--output", metavar="FILE", help="write the results as JSON")
+    parser.add_argument("--compare", metavar="FILE", help="compare against results saved with --output")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown that fails --compare (default: 0.2)")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)}")
+
+    SCALE = args.scale
+    SHAPE = args.shape
+    for name in args.names or BENCHMARKS:
+        print(f"== {name}")
+        _current_group = name
+        BENCHMARKS[name]()
+
+    settings = {"scale": SCALE, "shape": SHAPE, "python": platform.python_version()}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump({"settings": settings, "results": RESULTS}, file, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+        if baseline["settings"] != settings:
+            print(f"warning: baseline was run with {baseline['settings']}, this run with {settings}")
+        changes, regressions = compare_results(baseline["results"], RESULTS, args.threshold)
+        print(f"== compared with {args.compare}")
+        for key, previous, value, ratio in changes:
+            flag = "  REGRESSION" if key in regressions else ""
+            if RESULTS[key].get("reference"):
+                flag = "  (reference)"
+            print(f"{key:<64} {ratio:6.2f} x{flag}")
+        if regressions:
+            print(f"{len(regressions)} measurement(s) regressed by more than {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
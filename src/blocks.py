@@ -0,0 +1,202 @@
+import io
+import re
+from enum import Enum
+
+from htmlnode import LeafNode, ParentNode, render_html, text_to_children
+
+
+class BlockType(Enum):
+    PARAGRAPH = "paragraph"
+    HEADING = "heading"
+    CODE = "code"
+    QUOTE = "quote"
+    UNORDERED_LIST = "unordered_list"
+    ORDERED_LIST = "ordered_list"
+
+
+_HEADING_PATTERN = re.compile(r"(#{1,6}) ")
+_ORDERED_ITEM_PATTERN = re.compile(r"(\d+)\. ")
+_UNORDERED_ITEM_PREFIXES = ("- ", "* ")
+
+
+def iter_blocks(lines):
+    """
+    Groups lines of markdown into blocks, yielding each one as soon as it
+    is closed so only the current block is held in memory.
+
+    Blocks are separated by blank lines, except inside a ``` code fence,
+    which runs until its closing fence.
+
+    Args:
+        lines: An iterable of lines, such as an open file.
+
+    Yields:
+        Tuples of (BlockType, lines), with line endings removed.
+    """
+    block = []
+    in_code = False
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if in_code:
+            block.append(line)
+            if line.startswith("```"):
+                yield BlockType.CODE, block
+                block = []
+                in_code = False
+            continue
+        if line.startswith("```"):
+            if block:
+                yield block_to_block_type(block), block
+            block = [line]
+            in_code = True
+            continue
+        if not line.strip():
+            if block:
+                yield block_to_block_type(block), block
+                block = []
+            continue
+        block.append(line)
+
+    # An unclosed fence or a final block with no blank line after it
+    if block:
+        yield BlockType.CODE if in_code else block_to_block_type(block), block
+
+
+def block_to_block_type(lines):
+    if _HEADING_PATTERN.match(lines[0]):
+        return BlockType.HEADING
+    if lines[0].startswith("```"):
+        return BlockType.CODE
+    if all(line.startswith(">") for line in lines):
+        return BlockType.QUOTE
+    if all(line.startswith(_UNORDERED_ITEM_PREFIXES) for line in lines):
+        return BlockType.UNORDERED_LIST
+    for number, line in enumerate(lines, 1):
+        match = _ORDERED_ITEM_PATTERN.match(line)
+        if match is None or int(match.group(1)) != number:
+            return BlockType.PARAGRAPH
+    return BlockType.ORDERED_LIST
+
+
+# A MemoCache of inline HTML by paragraph text while set; see set_inline_memo
+_inline_memo = None
+
+
+def set_inline_memo(memo):
+    """
+    Makes block_to_html_node look up the inline HTML of every paragraph,
+    heading, quote and list item in memo (a rendercache.MemoCache over
+    render_inline), or stops it when memo is None. The HTML produced is
+    the same, but the block's inline content becomes a single LeafNode
+    holding it.
+
+    Returns:
+        The memo that was set before, so it can be put back.
+    """
+    global _inline_memo
+    previous = _inline_memo
+    _inline_memo = memo
+    return previous
+
+
+def get_inline_memo():
+    return _inline_memo
+
+
+def render_inline(text):
+    return "".join(node.to_html() for node in text_to_children(text))
+
+
+def inline_children(text):
+    if _inline_memo is None:
+        return text_to_children(text)
+    html = _inline_memo.render(text)
+    # Empty text has no children, which the block's ParentNode rejects
+    return [LeafNode(None, html)] if html else []
+
+
+def block_to_html_node(block_type, lines):
+    if block_type == BlockType.PARAGRAPH:
+        text = " ".join(line.strip() for line in lines)
+        return ParentNode("p", inline_children(text))
+    if block_type == BlockType.HEADING:
+        level = len(_HEADING_PATTERN.match(lines[0]).group(1))
+        text = " ".join(line.strip() for line in lines)[level + 1:]
+        return ParentNode(f"h{level}", inline_children(text))
+    if block_type == BlockType.CODE:
+        # Code is kept verbatim, without the fences or inline parsing
+        body = lines[1:-1] if len(lines) > 1 and lines[-1].startswith("```") else lines[1:]
+        text = "".join(line + "\n" for line in body)
+        return ParentNode("pre", [LeafNode("code", text)])
+    if block_type == BlockType.QUOTE:
+        text = " ".join(line.lstrip(">").strip() for line in lines)
+        return ParentNode("blockquote", inline_children(text))
+    if block_type == BlockType.UNORDERED_LIST:
+        items = [ParentNode("li", inline_children(line[2:])) for line in lines]
+        return ParentNode("ul", items)
+    if block_type == BlockType.ORDERED_LIST:
+        items = [
+            ParentNode("li", inline_children(line[_ORDERED_ITEM_PATTERN.match(line).end():]))
+            for line in lines
+        ]
+        return ParentNode("ol", items)
+    raise ValueError(f"Invalid BlockType: {block_type}")
+
+
+def iter_block_nodes(lines):
+    for block_type, block in iter_blocks(lines):
+        yield block_to_html_node(block_type, block)
+
+
+def markdown_lines(markdown):
+    """
+    Splits markdown text into lines the way iterating a file opened in
+    text mode does. Only newlines end a line, unlike str.splitlines(), so
+    a form feed or line separator stays in its line and a page renders the
+    same from a string as streamed from its file.
+
+    Args:
+        markdown: The markdown text.
+
+    Returns:
+        An iterable of lines.
+    """
+    return io.StringIO(markdown, newline=None)
+
+
+def markdown_to_html_node(markdown):
+    return ParentNode("div", list(iter_block_nodes(markdown_lines(markdown))))
+
+
+def markdown_batch_to_html(markdowns):
+    """
+    Renders many markdown documents in one call.
+
+    Each document gives the same HTML as
+    markdown_to_html_node(markdown).to_html(). The block patterns, inline
+    tokenizer and LeafNode dispatch table are built once at import, so
+    nothing is set up again per document.
+
+    Args:
+        markdowns: An iterable of markdown texts.
+
+    Returns:
+        A list of HTML strings, in the same order.
+    """
+    return [render_html(markdown_to_html_node(markdown)) for markdown in markdowns]
+
+
+def write_markdown_html(lines, stream):
+    """
+    Renders markdown to stream one block at a time. The output is the same
+    as markdown_to_html_node(...).to_html() but memory stays flat however
+    long the document is.
+
+    Args:
+        lines: An iterable of lines, such as an open file.
+        stream: Any object with a write(str) method.
+    """
+    stream.write("<div>")
+    for node in iter_block_nodes(lines):
+        stream.write(render_html(node))
+    stream.write("</div>")
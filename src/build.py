@@ -0,0 +1,699 @@
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from blocks import get_inline_memo, markdown_lines, markdown_to_html_node, set_inline_memo, write_markdown_html
+from compressed import ALL_FORMATS, CompressedWriter, remove_siblings, write_compressed
+from htmlnode import PARSER_VERSION, render_html
+from rendercache import MemoCache, RenderCache
+
+MANIFEST_NAME = ".build-manifest.json"
+
+DEFAULT_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{{ Title }}</title>
+</head>
+<body>
+{{ Content }}
+</body>
+</html>
+"""
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildManifest():
+    """
+    Remembers what the last build saw: a fingerprint (mtime, size and
+    content hash) for every input file and the inputs each output was
+    built from. A compressed build also records the content hash of each
+    page it wrote. A sharded build also records which shard it built, and
+    every manifest records the directory it was built into, so
+    merge_shards can find the outputs after that directory moves.
+
+    Args:
+        path: The JSON file the manifest is loaded from and saved to.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.version = PARSER_VERSION
+        self.files = {}
+        self.outputs = {}
+        self.hashes = {}
+        self.root = os.path.dirname(path)
+        self.shard = None
+        self.checked = {}
+        self.updated = False
+
+    @classmethod
+    def load(cls, path):
+        manifest = cls(path)
+        try:
+            with open(path, encoding="utf-8") as file:
+                data = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return manifest
+        # Outputs from another parser version can't be trusted
+        if data.get("version") == PARSER_VERSION:
+            manifest.files = data.get("files", {})
+            manifest.outputs = data.get("outputs", {})
+            manifest.hashes = data.get("hashes", {})
+            manifest.root = data.get("root", manifest.root)
+            manifest.shard = data.get("shard")
+        return manifest
+
+    def save(self):
+        data = {
+            "version": self.version,
+            "files": self.files,
+            "outputs": self.outputs,
+            "hashes": self.hashes,
+            "root": self.root,
+            "shard": self.shard,
+        }
+        temporary_path = f"{self.path}.tmp"
+        # Compact output keeps json on its C encoder, which matters at 20k pages
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(data, file, separators=(",", ":"), sort_keys=True)
+        os.replace(temporary_path, self.path)
+
+    def changed(self, path):
+        """
+        Returns True if path differs from the last build.
+
+        The mtime and size are checked first and the file is only hashed
+        when they moved, so a touched but unchanged file is not rebuilt.
+        """
+        if path in self.checked:
+            return self.checked[path]
+        stat = os.stat(path)
+        previous = self.files.get(path)
+        if previous and previous["mtime_ns"] == stat.st_mtime_ns and previous["size"] == stat.st_size:
+            changed = False
+        else:
+            digest = file_hash(path)
+            changed = previous is None or previous["sha256"] != digest
+            self.files[path] = {
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "sha256": digest,
+            }
+            self.updated = True
+        self.checked[path] = changed
+        return changed
+
+    def stale(self, output, dependencies):
+        # Check every dependency so all their fingerprints get refreshed
+        changed = [self.changed(path) for path in dependencies]
+        if any(changed) or not os.path.exists(output):
+            return True
+        return self.outputs.get(output) != dependencies
+
+
+def extract_title(markdown):
+    # Accepts the markdown text or an iterable of its lines, like a file
+    lines = markdown_lines(markdown) if isinstance(markdown, str) else markdown
+    for line in lines:
+        if line.startswith("# "):
+            return line[2:].strip()
+    return None
+
+
+def render_content(markdown):
+    return render_html(markdown_to_html_node(markdown))
+
+
+def render_page(markdown, template, default_title="", render=render_content):
+    content = render(markdown)
+    title = extract_title(markdown) or default_title
+    return template.replace("{{ Title }}", title).replace("{{ Content }}", content)
+
+
+def build_page(source, output, template, render=None, compress=None, previous_hash=None):
+    """
+    Renders the markdown page at source into output.
+
+    Without a render function the page is streamed: the source is read
+    once to find its title and again to render it block by block, so a
+    huge page never sits in memory whole.
+
+    With compress, a tuple of extensions from compressed.AVAILABLE_FORMATS,
+    the page goes through a CompressedWriter that writes those siblings in
+    the same pass and keeps the existing files when the content hash
+    equals previous_hash.
+
+    Returns:
+        A tuple of (content hash, whether output was written); the hash is
+        None when not compressing.
+    """
+    default_title = os.path.splitext(os.path.basename(source))[0]
+    # A plain page is streamed into a temporary file that only replaces
+    # output once the page rendered, so a failed render leaves no
+    # truncated page; a CompressedWriter cleans up after itself
+    temporary_path = f"{output}.tmp"
+    try:
+        with open(source, encoding="utf-8") as file:
+            if compress is None:
+                os.makedirs(os.path.dirname(output), exist_ok=True)
+                out = open(temporary_path, "w", encoding="utf-8")
+            else:
+                out = CompressedWriter(output, compress, previous_hash)
+            with out:
+                if render is not None:
+                    out.write(render_page(file.read(), template, default_title, render))
+                else:
+                    title = extract_title(file) or default_title
+                    file.seek(0)
+                    head, _, tail = template.partition("{{ Content }}")
+                    out.write(head.replace("{{ Title }}", title))
+                    write_markdown_html(file, out)
+                    out.write(tail.replace("{{ Title }}", title))
+    except Exception as error:
+        if compress is None and os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        error.add_note(f"While building {output} from {source}")
+        raise
+    if compress is None:
+        os.replace(temporary_path, output)
+        return None, True
+    return out.hash, out.written
+
+
+# Each worker process builds its own RenderCache over the shared directory
+_worker_cache = None
+
+# Counters a worker's caches send back to the parent's
+_CACHE_COUNTERS = ("hits", "misses", "evictions")
+
+
+def _worker_settings(render_cache):
+    # What _init_worker needs to rebuild the parent's caches in a worker,
+    # which a spawned process doesn't inherit
+    cache_settings = None
+    if render_cache:
+        cache_settings = (render_cache.directory, render_cache.max_entries, render_cache.max_bytes)
+    memo_settings = None
+    memo = get_inline_memo()
+    if memo:
+        memo_settings = (memo.render_source, memo.max_entries, memo.max_bytes)
+    return cache_settings, memo_settings
+
+
+def _init_worker(cache_settings, memo_settings):
+    global _worker_cache
+    if cache_settings is not None:
+        directory, max_entries, max_bytes = cache_settings
+        _worker_cache = RenderCache(directory, render_content, max_entries, max_bytes)
+    # Each worker keeps its own memo, even one forked with the parent's
+    set_inline_memo(MemoCache(*memo_settings) if memo_settings else None)
+
+
+def _cache_counts():
+    caches = {"cache": _worker_cache, "memo": get_inline_memo()}
+    return {
+        name: [getattr(cache, counter) for counter in _CACHE_COUNTERS]
+        for name, cache in caches.items() if cache
+    }
+
+
+def _counts_since(before):
+    return {
+        name: [value - previous for value, previous in zip(counts, before[name])]
+        for name, counts in _cache_counts().items()
+    }
+
+
+def _add_counts(counts, render_cache):
+    # Adds a worker's cache counters to the parent's caches
+    caches = {"cache": render_cache, "memo": get_inline_memo()}
+    for name, deltas in counts.items():
+        cache = caches.get(name)
+        if cache:
+            for counter, delta in zip(_CACHE_COUNTERS, deltas):
+                setattr(cache, counter, getattr(cache, counter) + delta)
+
+
+def _build_chunk(chunk, template, compress, hashes):
+    # Runs in a worker: pages are written there so only counters and
+    # content hashes come back
+    render = _worker_cache.render if _worker_cache else None
+    before = _cache_counts()
+    results = [
+        (output, *build_page(source, output, template, render, compress, hashes.get(output)))
+        for source, output in chunk
+    ]
+    return _counts_since(before), results
+
+
+def _render_in_worker(markdown):
+    # render_content for the async pipeline's process pool, also sending
+    # back what it did to the worker's memo
+    before = _cache_counts()
+    return render_content(markdown), _counts_since(before)
+
+
+def build_pages_parallel(pages, template, jobs, render_cache=None, compress=None, hashes=None):
+    """
+    Renders pages across a pool of worker processes.
+
+    Pages are handed out in chunks so each worker gets enough work to make
+    up for the cost of sending it. The HTML is the same as a serial build.
+
+    Args:
+        pages: List of (source path, output path) pairs.
+        template: The page template text.
+        jobs: Number of worker processes.
+        render_cache: Optional RenderCache whose directory the workers
+            share. Its limits are applied to the whole directory afterwards.
+        compress: Optional compressed sibling extensions, as for build_page.
+        hashes: Output path -> content hash of the page there now.
+
+    Returns:
+        A list of (output path, content hash, whether it was written)
+        tuples, as build_page returns for each page.
+    """
+    hashes = hashes or {}
+    chunk_size = max(1, min(64, len(pages) // (jobs * 4)))
+    chunks = [pages[index:index + chunk_size] for index in range(0, len(pages), chunk_size)]
+    # Each worker only gets the hashes of its own chunk
+    chunk_hashes = [{output: hashes[output] for _, output in chunk if output in hashes} for chunk in chunks]
+    results = []
+    with ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=_worker_settings(render_cache)) as executor:
+        arguments = (chunks, [template] * len(chunks), [compress] * len(chunks), chunk_hashes)
+        for counts, chunk_results in executor.map(_build_chunk, *arguments):
+            _add_counts(counts, render_cache)
+            results.extend(chunk_results)
+    if render_cache:
+        # Each worker only held its own entries to the limits, so the
+        # directory can hold up to jobs times them
+        render_cache.reload()
+        render_cache.evict()
+    return results
+
+
+def _read_source(path):
+    with open(path, encoding="utf-8") as file:
+        return file.read()
+
+
+def _write_output(path, html):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(html)
+
+
+# Ends a pipeline queue; each consumer stops at the first one it takes
+_DONE = None
+
+
+async def build_pages_async(
+    pages, template, jobs=1, render_cache=None, queue_size=16, io_threads=4, compress=None, hashes=None
+):
+    """
+    Renders pages through an asyncio pipeline that overlaps file I/O with
+    rendering.
+
+    A reader stage loads sources on I/O threads, jobs render tasks turn
+    them into HTML and a writer stage saves the pages on I/O threads. The
+    stages are joined by queues of at most queue_size pages, so a slow
+    writer holds back rendering and slow rendering holds back reading
+    instead of pages piling up in memory. Rendering runs in a process pool
+    when jobs is more than 1, otherwise on a single thread. The HTML is the
+    same as a serial build.
+
+    Args:
+        pages: List of (source path, output path) pairs.
+        template: The page template text.
+        jobs: Number of pages rendered at once.
+        render_cache: Optional RenderCache consulted before rendering.
+        queue_size: Most pages waiting between two stages.
+        io_threads: Threads reading and writing files.
+        compress: Optional compressed sibling extensions, as for build_page.
+        hashes: Output path -> content hash of the page there now.
+
+    Returns:
+        A list of (output path, content hash, whether it was written)
+        tuples, in the order the pages were written.
+    """
+    hashes = hashes or {}
+    results = []
+    loop = asyncio.get_running_loop()
+    read_queue = asyncio.Queue(queue_size)
+    write_queue = asyncio.Queue(queue_size)
+    io_executor = ThreadPoolExecutor(io_threads)
+    # RenderCache isn't thread-safe, so its lookups share one thread
+    cache_executor = ThreadPoolExecutor(1)
+    if jobs > 1:
+        # The render cache stays in this process; workers only get the memo
+        render_executor = ProcessPoolExecutor(
+            jobs, initializer=_init_worker, initargs=(None, _worker_settings(None)[1])
+        )
+    else:
+        render_executor = ThreadPoolExecutor(1)
+
+    async def read():
+        for source, output in pages:
+            markdown = await loop.run_in_executor(io_executor, _read_source, source)
+            await read_queue.put((source, output, markdown))
+        for _ in range(jobs):
+            await read_queue.put(_DONE)
+
+    async def render():
+        while (item := await read_queue.get()) is not _DONE:
+            source, output, markdown = item
+            content = None
+            if render_cache:
+                content = await loop.run_in_executor(cache_executor, render_cache.get, markdown)
+            if content is None:
+                try:
+                    if jobs > 1:
+                        content, counts = await loop.run_in_executor(render_executor, _render_in_worker, markdown)
+                        _add_counts(counts, None)
+                    else:
+                        content = await loop.run_in_executor(render_executor, render_content, markdown)
+                except Exception as error:
+                    error.add_note(f"While building {output} from {source}")
+                    raise
+                if render_cache:
+                    await loop.run_in_executor(cache_executor, render_cache.put, markdown, content)
+            default_title = os.path.splitext(os.path.basename(source))[0]
+            html = render_page(markdown, template, default_title, lambda _: content)
+            await write_queue.put((output, html))
+        await write_queue.put(_DONE)
+
+    async def write_page(output, html):
+        if compress is None:
+            await loop.run_in_executor(io_executor, _write_output, output, html)
+            results.append((output, None, True))
+            return
+        digest, written = await loop.run_in_executor(
+            io_executor, write_compressed, output, html, compress, hashes.get(output)
+        )
+        results.append((output, digest, written))
+
+    async def write():
+        running = jobs
+        pending = set()
+        while running:
+            item = await write_queue.get()
+            if item is _DONE:
+                running -= 1
+                continue
+            pending.add(asyncio.ensure_future(write_page(*item)))
+            # Keep at most one write per I/O thread in flight
+            if len(pending) >= io_threads:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    # Raises a failed write's error so the build stops with it
+                    task.result()
+        await asyncio.gather(*pending)
+
+    try:
+        async with asyncio.TaskGroup() as tasks:
+            tasks.create_task(read())
+            for _ in range(jobs):
+                tasks.create_task(render())
+            tasks.create_task(write())
+    finally:
+        io_executor.shutdown()
+        cache_executor.shutdown()
+        render_executor.shutdown()
+    return results
+
+
+def find_content(content_dir, dest_dir):
+    """
+    Lists the markdown pages and other assets under content_dir.
+
+    Returns:
+        Two sorted lists of (source path, output path) pairs, one for pages
+        and one for assets.
+    """
+    pages = []
+    assets = []
+    for directory, _, files in os.walk(content_dir):
+        output_directory = os.path.normpath(
+            os.path.join(dest_dir, os.path.relpath(directory, content_dir))
+        )
+        for name in files:
+            source = os.path.join(directory, name)
+            if name.endswith(".md"):
+                pages.append((source, os.path.join(output_directory, name[:-3] + ".html")))
+            else:
+                assets.append((source, os.path.join(output_directory, name)))
+    return sorted(pages), sorted(assets)
+
+
+def shard_of(path, count):
+    """
+    Returns which of count shards, from 0 to count - 1, the file at path
+    relative to the content directory belongs to.
+
+    The shard comes from a SHA-256 of the path rather than hash(), which
+    is salted per process, so every worker on every machine agrees on it.
+    """
+    digest = hashlib.sha256(path.replace(os.sep, "/").encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+def _in_shard(pairs, content_dir, shard):
+    index, count = shard
+    return [(source, output) for source, output in pairs if shard_of(os.path.relpath(source, content_dir), count) == index]
+
+
+def build_site(
+    content_dir,
+    dest_dir,
+    template_path=None,
+    render_cache=None,
+    force=False,
+    jobs=1,
+    profile=None,
+    async_io=False,
+    shard=None,
+    compress=None,
+):
+    """
+    Renders every markdown file under content_dir into dest_dir, copying
+    any other files alongside as assets.
+
+    Only outputs whose source, template or asset changed since the last
+    build are regenerated; everything else is left in place. Outputs whose
+    source was deleted are removed.
+
+    Args:
+        content_dir: Directory of markdown pages and assets.
+        dest_dir: Directory the site is written to.
+        template_path: HTML template with {{ Title }} and {{ Content }}
+            placeholders. A minimal built-in template is used when None.
+        render_cache: Optional RenderCache used to render page content.
+        force: Rebuild everything regardless of the manifest.
+        jobs: Number of processes to render pages with.
+        profile: Optional BuildProfile to record each page's stage timings
+            in. Pages are then built in this process whatever jobs is, as
+            the stage hook can't see into worker processes.
+        async_io: Render pages through build_pages_async, overlapping file
+            reads and writes with rendering.
+        shard: Optional (index, count) pair. Only the pages and assets that
+            shard_of puts in shard index of count are built, so count
+            workers with their own dest_dir split the site between them;
+            merge_shards then puts it back together.
+        compress: Optional tuple of extensions from
+            compressed.AVAILABLE_FORMATS. Each page is then written with
+            those precompressed siblings in the same pass, and a page that
+            renders to the same HTML as before is left untouched and
+            counted as up to date.
+
+    Returns:
+        A dict listing the outputs that were built and removed, and how
+        many were already up to date.
+
+    Raises:
+        FileNotFoundError: If content_dir is not a directory, which would
+            otherwise look like every page was deleted.
+    """
+    if not os.path.isdir(content_dir):
+        raise FileNotFoundError(f"Content directory {content_dir} does not exist")
+    os.makedirs(dest_dir, exist_ok=True)
+    manifest_path = os.path.join(dest_dir, MANIFEST_NAME)
+    manifest = BuildManifest(manifest_path) if force else BuildManifest.load(manifest_path)
+    pages, assets = find_content(content_dir, dest_dir)
+    if shard is not None:
+        pages = _in_shard(pages, content_dir, shard)
+        assets = _in_shard(assets, content_dir, shard)
+        shard = list(shard)
+    template_dependencies = [template_path] if template_path else []
+
+    built = []
+    skipped = 0
+    outputs = {}
+
+    stale_pages = []
+    for source, output in pages:
+        dependencies = [source] + template_dependencies
+        outputs[output] = dependencies
+        missing_siblings = compress and not all(os.path.exists(f"{output}.{extension}") for extension in compress)
+        if manifest.stale(output, dependencies) or missing_siblings:
+            stale_pages.append((source, output))
+        else:
+            skipped += 1
+
+    if stale_pages:
+        template = DEFAULT_TEMPLATE
+        if template_path:
+            with open(template_path, encoding="utf-8") as file:
+                template = file.read()
+        # Hashes only describe pages the last compressed build wrote
+        hashes = manifest.hashes if compress else {}
+        if async_io and profile is None:
+            results = asyncio.run(
+                build_pages_async(stale_pages, template, jobs, render_cache, compress=compress, hashes=hashes)
+            )
+        elif jobs > 1 and len(stale_pages) > 1 and profile is None:
+            results = build_pages_parallel(stale_pages, template, jobs, render_cache, compress, hashes)
+        else:
+            render = render_cache.render if render_cache else None
+            results = []
+            for source, output in stale_pages:
+                arguments = (source, output, template, render, compress, hashes.get(output))
+                if profile is None:
+                    results.append((output, *build_page(*arguments)))
+                    continue
+                with profile.page(source):
+                    results.append((output, *build_page(*arguments)))
+        results = {output: (digest, written) for output, digest, written in results}
+        for _, output in stale_pages:
+            digest, written = results[output]
+            if written:
+                built.append(output)
+                # Siblings that weren't just written no longer match the page
+                remove_siblings(output, compress or ())
+            else:
+                skipped += 1
+            if digest is None:
+                manifest.hashes.pop(output, None)
+            else:
+                manifest.hashes[output] = digest
+
+    for source, output in assets:
+        dependencies = [source]
+        outputs[output] = dependencies
+        if not manifest.stale(output, dependencies):
+            skipped += 1
+            continue
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        shutil.copyfile(source, output)
+        built.append(output)
+
+    # Remove outputs whose sources no longer exist
+    removed = []
+    for output in manifest.outputs:
+        if output not in outputs and os.path.exists(output):
+            os.remove(output)
+            remove_siblings(output)
+            removed.append(output)
+
+    # Forget inputs that are gone so the manifest doesn't grow forever
+    inputs = {path for dependencies in outputs.values() for path in dependencies}
+    files = {path: entry for path, entry in manifest.files.items() if path in inputs}
+    hashes = {output: digest for output, digest in manifest.hashes.items() if output in outputs}
+    if (
+        built or removed or manifest.updated or files != manifest.files or outputs != manifest.outputs
+        or hashes != manifest.hashes or shard != manifest.shard
+    ):
+        manifest.files = files
+        manifest.hashes = hashes
+        manifest.outputs = outputs
+        manifest.root = dest_dir
+        manifest.shard = shard
+        manifest.save()
+
+    return {"built": built, "removed": removed, "skipped": skipped}
+
+
+def _same_file(source, destination):
+    try:
+        destination_stat = os.stat(destination)
+    except FileNotFoundError:
+        return False
+    source_stat = os.stat(source)
+    return (source_stat.st_size, source_stat.st_mtime_ns) == (destination_stat.st_size, destination_stat.st_mtime_ns)
+
+
+def merge_shards(shard_dirs, dest_dir):
+    """
+    Assembles the outputs of a sharded build into dest_dir.
+
+    Every output listed in a shard's manifest is copied to the same place
+    under dest_dir, keeping its mtime, so one whose size and mtime already
+    match is left alone and re-merging after an incremental build only
+    copies what changed. The shard manifests are combined into one for
+    dest_dir, and outputs the last merge had but no shard built any more
+    are removed.
+
+    Args:
+        shard_dirs: The dest_dir of every shard; may be moved or
+            downloaded elsewhere after the shards were built.
+        dest_dir: Directory the merged site is written to.
+
+    Raises:
+        ValueError: If the directories aren't exactly one of each shard
+            of the same build, as a missing shard would drop its pages.
+
+    Returns:
+        A dict listing the outputs that were copied and removed, and how
+        many were already up to date.
+    """
+    manifests = [BuildManifest.load(os.path.join(shard_dir, MANIFEST_NAME)) for shard_dir in shard_dirs]
+    shards = sorted(tuple(manifest.shard) for manifest in manifests if manifest.shard)
+    if len(shards) != len(manifests) or shards != [(index, len(shards)) for index in range(len(shards))]:
+        raise ValueError(f"Expected one of each shard of the same build, got {shards}")
+
+    os.makedirs(dest_dir, exist_ok=True)
+    manifest_path = os.path.join(dest_dir, MANIFEST_NAME)
+    previous = BuildManifest.load(manifest_path)
+    merged = BuildManifest(manifest_path)
+    copied = []
+    skipped = 0
+    for shard_dir, manifest in zip(shard_dirs, manifests):
+        merged.files.update(manifest.files)
+        for output, dependencies in manifest.outputs.items():
+            relative = os.path.relpath(output, manifest.root)
+            source = os.path.join(shard_dir, relative)
+            destination = os.path.normpath(os.path.join(dest_dir, relative))
+            merged.outputs[destination] = dependencies
+            if output in manifest.hashes:
+                merged.hashes[destination] = manifest.hashes[output]
+            if _same_file(source, destination):
+                skipped += 1
+                continue
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            shutil.copy2(source, destination)
+            # Compressed siblings travel with their page
+            remove_siblings(destination)
+            for extension in ALL_FORMATS:
+                if os.path.exists(f"{source}.{extension}"):
+                    shutil.copy2(f"{source}.{extension}", f"{destination}.{extension}")
+            copied.append(destination)
+
+    removed = []
+    for output in previous.outputs:
+        if output not in merged.outputs and os.path.exists(output):
+            os.remove(output)
+            remove_siblings(output)
+            removed.append(output)
+    merged.save()
+
+    return {"built": copied, "removed": removed, "skipped": skipped}
@@ -0,0 +1,201 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Extensions of the compressed siblings written next to a page
+ALL_FORMATS = ("gz", "br")
+AVAILABLE_FORMATS = ALL_FORMATS if brotli else ("gz",)
+
+# zlib window bits that make it write a gzip header and trailer
+_GZIP_WBITS = 31
+
+
+def _remove_temporary(paths):
+    for path in paths:
+        try:
+            os.remove(f"{path}.tmp")
+        except FileNotFoundError:
+            pass
+
+
+class _CompressedFile():
+    # Writes what a zlib or brotli compressor produces to file
+    def __init__(self, file, compress, finish):
+        self.file = file
+        self.compress = compress
+        self.finish = finish
+
+    def write(self, data):
+        self.file.write(self.compress(data))
+
+    def close(self):
+        self.file.write(self.finish())
+
+
+class CompressedWriter():
+    """
+    Writes a page and its precompressed siblings (path.gz, and path.br
+    when brotli is installed) in one pass: the strings written are
+    gathered into chunks of up to buffer_size, and each chunk is encoded
+    once and fed to the plain file and every compressor, so a rendered
+    page is never read back.
+
+    With a previous_hash the output is held, in memory up to spill bytes
+    per file and on disk past that, until close() knows its SHA-256. If it
+    matches and every file is already there, nothing is written and the
+    existing files keep their mtimes. Either way the files are written to
+    temporary files beside them and moved into place once complete, so a
+    reader never sees a missing or partial page.
+
+    Use as a context manager so a failed render leaves no partial files
+    and the previous ones in place:
+
+        with CompressedWriter(output, previous_hash=old_hash) as out:
+            write_markdown_html(lines, out)
+        new_hash = out.hash
+
+    Args:
+        path: The plain output file.
+        formats: Sibling extensions to write, from AVAILABLE_FORMATS.
+        previous_hash: Hex SHA-256 of the content the files hold now.
+        gzip_level: gzip compression level, 1 to 9.
+        brotli_quality: brotli quality, 0 to 11.
+        spill: Bytes of each file held in memory before using disk.
+        buffer_size: Bytes of small writes gathered before they're
+            passed on, as compressors work faster on larger chunks.
+    """
+
+    def __init__(
+        self,
+        path,
+        formats=AVAILABLE_FORMATS,
+        previous_hash=None,
+        gzip_level=9,
+        brotli_quality=11,
+        spill=1 << 20,
+        buffer_size=1 << 16,
+    ):
+        unsupported = [extension for extension in formats if extension not in AVAILABLE_FORMATS]
+        if unsupported:
+            raise ValueError(f"Unsupported compressed formats: {unsupported}")
+        self.path = path
+        self.previous_hash = previous_hash
+        self.digest = hashlib.sha256()
+        self.hash = None
+        self.written = False
+        self.pending = []
+        self.pending_size = 0
+        self.buffer_size = buffer_size
+        # The plain file, then each sibling
+        self.paths = [path] + [f"{path}.{extension}" for extension in formats]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if previous_hash is None:
+            self.files = [open(f"{file_path}.tmp", "wb") for file_path in self.paths]
+        else:
+            self.files = [tempfile.SpooledTemporaryFile(spill) for _ in self.paths]
+        # What each write goes to; the compressors are closed before their files
+        self.streams = [self.files[0]]
+        for extension, file in zip(formats, self.files[1:]):
+            if extension == "gz":
+                # zlib leaves the name and time out of the header, so equal
+                # pages compress equally
+                compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, _GZIP_WBITS)
+                self.streams.append(_CompressedFile(file, compressor.compress, compressor.flush))
+            else:
+                compressor = brotli.Compressor(quality=brotli_quality)
+                self.streams.append(_CompressedFile(file, compressor.process, compressor.finish))
+
+    def write(self, text):
+        self.pending.append(text)
+        self.pending_size += len(text)
+        if self.pending_size >= self.buffer_size:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        data = "".join(self.pending).encode("utf-8")
+        self.pending = []
+        self.pending_size = 0
+        self.digest.update(data)
+        for stream in self.streams:
+            stream.write(data)
+
+    def finish(self):
+        self.flush()
+        for stream in self.streams[1:]:
+            stream.close()
+        self.hash = self.digest.hexdigest()
+
+    def close(self):
+        """
+        Finishes every file and puts it in place, unless the content is
+        unchanged.
+
+        Returns:
+            True if the files were written, False if they were kept.
+        """
+        try:
+            self.finish()
+            if self.previous_hash is not None:
+                if self.hash == self.previous_hash and all(os.path.exists(path) for path in self.paths):
+                    return False
+                for path, file in zip(self.paths, self.files):
+                    file.seek(0)
+                    with open(f"{path}.tmp", "wb") as output:
+                        shutil.copyfileobj(file, output)
+        except BaseException:
+            self.discard()
+            raise
+        finally:
+            for file in self.files:
+                file.close()
+        for path in self.paths:
+            os.replace(f"{path}.tmp", path)
+        self.written = True
+        return True
+
+    def discard(self):
+        # Whatever is pending is dropped, not flushed
+        for file in self.files:
+            file.close()
+        _remove_temporary(self.paths)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+def write_compressed(path, html, formats=AVAILABLE_FORMATS, previous_hash=None):
+    """
+    Writes html to path and its compressed siblings with a
+    CompressedWriter.
+
+    Returns:
+        A tuple of (content hash, whether the files were written).
+    """
+    with CompressedWriter(path, formats, previous_hash) as out:
+        out.write(html)
+    return out.hash, out.written
+
+
+def remove_siblings(path, keep=()):
+    # Compressed copies of a page that's removed, or rewritten without them
+    for extension in ALL_FORMATS:
+        if extension in keep:
+            continue
+        try:
+            os.remove(f"{path}.{extension}")
+        except FileNotFoundError:
+            pass
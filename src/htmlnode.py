@@ -1,7 +1,137 @@
-from textnode import TextNode, TextType
+from textnode import FrozenTextNode, TextNode, TextType
+import bisect
+import functools
 import re
+import time
+
+# Bump whenever a change alters the HTML produced for the same markdown, so
+# cached renders from older versions are not reused
+PARSER_VERSION = "4"
+
+# Characters that can't appear raw inside a double-quoted attribute value
+_ATTRIBUTE_ESCAPES = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+})
+
+
+# Called as hook(stage, seconds, nodes, size) after every instrumented call
+# while set; see set_stage_hook
+_stage_hook = None
+
+
+def set_stage_hook(hook):
+    """
+    Installs a function to be told about every call of an instrumented
+    stage, or removes it when hook is None.
+
+    The hook is called as hook(stage, seconds, nodes, size): the stage name,
+    the call's wall time, how many nodes it produced and how many bytes of
+    UTF-8 it emitted (0 for stages that produce nodes rather than text).
+
+    Returns:
+        The hook that was installed before, so it can be put back.
+    """
+    global _stage_hook
+    previous = _stage_hook
+    _stage_hook = hook
+    return previous
+
+
+def instrumented(stage, measure):
+    """
+    Decorates a pipeline stage so its calls are reported to the stage hook.
+
+    With no hook installed the wrapper only checks for one and calls
+    through, so instrumented stages cost next to nothing in normal builds.
+
+    Args:
+        stage: The name reported for the stage.
+        measure: Function turning the stage's result into (nodes, size).
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            hook = _stage_hook
+            if hook is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            seconds = time.perf_counter() - start
+            hook(stage, seconds, *measure(result))
+            return result
+        return wrapper
+    return decorate
+
+
+def _count_nodes(nodes):
+    return len(nodes), 0
+
+
+def _count_bytes(html):
+    return 0, len(html.encode())
+
+
+class HTMLProps(dict):
+    """
+    The props of an HTMLNode: a dict that remembers its serialized
+    attribute string until it is modified.
+    """
+    __slots__ = ("_html",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._html = None
+
+    def to_html(self):
+        if self._html is None:
+            self._html = "".join([
+                f' {key}="{str(value).translate(_ATTRIBUTE_ESCAPES)}"'
+                for key, value in self.items()
+            ])
+        return self._html
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._html = None
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._html = None
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def clear(self):
+        super().clear()
+        self._html = None
+
+    def pop(self, *args):
+        value = super().pop(*args)
+        self._html = None
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self._html = None
+        return item
+
+    def setdefault(self, key, default=None):
+        value = super().setdefault(key, default)
+        self._html = None
+        return value
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._html = None
+
 
 class HTMLNode():
+    # Slotted to keep large trees compact; subclasses add no attributes
+    __slots__ = ("tag", "value", "children", "_props", "_html")
     
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
@@ -9,23 +139,79 @@ class HTMLNode():
         self.children = children
         self.props = props
 
+    @property
+    def props(self):
+        return self._props
+
+    @props.setter
+    def props(self, props):
+        # Stored as HTMLProps so the attribute string can be cached; a plain
+        # dict is copied, so later edits must go through node.props
+        if props is not None and not isinstance(props, HTMLProps):
+            props = HTMLProps(props)
+        self._props = props
+
     def to_html(self):
-        raise NotImplementedError("to_html method not implemented")
+        return "".join(self.iter_html())
+
+    def iter_html(self):
+        raise NotImplementedError("iter_html method not implemented")
+
+    def write_html(self, stream):
+        """
+        Writes the HTML for this node to a file-like object fragment by
+        fragment, without building the whole document in memory.
+
+        Args:
+            stream: Any object with a write(str) method.
+        """
+        write = stream.write
+        for fragment in self.iter_html():
+            write(fragment)
     
     def props_to_html(self):
-        if self.props is None:            
+        if self._props is None:            
             return ""
-        props_html = ""
-        for prop in self.props:
-            props_html += f' {prop}="{self.props[prop]}"'
-        return props_html
+        return self._props.to_html()
+    def freeze(self):
+        """
+        Makes this node and everything below it immutable, so each frozen
+        node can render its HTML once and reuse it. Use it for subtrees such
+        as headers and footers that are shared between many pages.
+
+        Assigning to a frozen node's attributes raises AttributeError and
+        modifying its props raises TypeError; build a new tree to change
+        one. Children are stored as a tuple.
+
+        Returns:
+            The node itself.
+        """
+        pending = [self]
+        while pending:
+            node = pending.pop()
+            if isinstance(node, _FrozenNode):
+                continue
+            if node._props is not None:
+                node._props = FrozenHTMLProps(node._props)
+            if node.children is not None:
+                node.children = tuple(node.children)
+                pending.extend(node.children)
+            node._html = None
+            node.__class__ = _frozen_class(type(node))
+        return self
+
+    @property
+    def frozen(self):
+        return isinstance(self, _FrozenNode)
+
     def __repr__(self):
         return f'HTMLNode({self.tag}, {self.value}, children: {self.children}, {self.props})'
     
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag, value, None, props)
-        self.props = props
     
     def to_html(self):
         if self.value == None:
@@ -35,55 +221,224 @@ class LeafNode(HTMLNode):
         
         
         return f'<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>'
+
+    def iter_html(self):
+        yield self.to_html()
+
+    def write_html(self, stream):
+        stream.write(self.to_html())
     
     def __repr__(self):
         return f"LeafNode({self.tag}, {self.value}, {self.props})"
     
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
 
     def __init__(self, tag, children, props=None):
-        super().__init__(tag, None, props)
-        
-        self.children = children
-        self.props = props
+        super().__init__(tag, None, children, props)
         
-    def to_html(self):
+    def iter_html(self):
+        # Walk the tree with an explicit stack of open elements rather than
+        # recursing, so nesting depth is not bounded by the recursion limit
+        # Frozen subtrees are emitted from their cached HTML. While rendering
+        # a frozen node itself, uncached frozen descendants are walked inline
+        # instead, so a deep frozen tree doesn't recurse through to_html
+        cache_frozen = not isinstance(self, _FrozenNode)
+        yield self.open_tag()
+        stack = [(f"</{self.tag}>", iter(self.children))]
+        push = stack.append
+        while stack:
+            close_tag, children = stack[-1]
+            for child in children:
+                if isinstance(child, LeafNode):
+                    yield child.to_html()
+                elif isinstance(child, _FrozenNode) and (cache_frozen or child._html is not None):
+                    yield child.to_html()
+                elif isinstance(child, ParentNode):
+                    yield child.open_tag()
+                    push((f"</{child.tag}>", iter(child.children)))
+                    break
+                else:
+                    yield from child.iter_html()
+            else:
+                stack.pop()
+                yield close_tag
+
+    def open_tag(self):
         if self.tag is None:
             raise ValueError("invalid HTML: no tag")
         if self.children is None:
             raise ValueError("invalid HTML: no children")
-        childs = ""
-        for child in self.children:
-            
-            childs += child.to_html()
-        result = f"<{self.tag}{self.props_to_html()}>{childs}</{self.tag}>"
-        
-        return result
-    
+        return f"<{self.tag}{self.props_to_html()}>"
+
+
+class FrozenHTMLProps(HTMLProps):
+    """
+    The props of a frozen node, which can't be modified.
+    """
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("props of a frozen node cannot be modified")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        # Unpickling a dict fills it through __setitem__
+        return FrozenHTMLProps, (dict(self),)
+
+
+class _FrozenNode():
+    # Mixed in ahead of a node class by freeze(). Rendered HTML is kept in
+    # the _html slot, which is only ever used by frozen nodes
+    __slots__ = ()
+    _unfrozen_class = HTMLNode
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"cannot modify frozen {type(self).__name__}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"cannot modify frozen {type(self).__name__}")
+
+    def to_html(self):
+        if self._html is None:
+            # Render through the original class, whose methods would
+            # otherwise call back into this one
+            cls = self._unfrozen_class
+            if issubclass(cls, LeafNode):
+                html = cls.to_html(self)
+            else:
+                html = "".join(cls.iter_html(self))
+            object.__setattr__(self, "_html", html)
+        return self._html
+
+    def iter_html(self):
+        yield self.to_html()
+
+    def write_html(self, stream):
+        stream.write(self.to_html())
+
+    def freeze(self):
+        return self
+
+    def __reduce__(self):
+        # Rebuilt unfrozen and frozen again, as __setattr__ would refuse the
+        # default way of restoring slots; children arrive already frozen
+        props = None if self._props is None else dict(self._props)
+        return _unpickle_frozen, (self._unfrozen_class, self.tag, self.value, self.children, props)
+
+
+class FrozenHTMLNode(_FrozenNode, HTMLNode):
+    __slots__ = ()
+    _unfrozen_class = HTMLNode
+
+
+class FrozenLeafNode(_FrozenNode, LeafNode):
+    __slots__ = ()
+    _unfrozen_class = LeafNode
+
+
+class FrozenParentNode(_FrozenNode, ParentNode):
+    __slots__ = ()
+    _unfrozen_class = ParentNode
+
+
+_FROZEN_CLASSES = {
+    HTMLNode: FrozenHTMLNode,
+    LeafNode: FrozenLeafNode,
+    ParentNode: FrozenParentNode,
+}
+
+
+def _unpickle_frozen(cls, tag, value, children, props):
+    node = cls.__new__(cls)
+    HTMLNode.__init__(node, tag, value, children, props)
+    return node.freeze()
+
+
+def _frozen_class(cls):
+    frozen_class = _FROZEN_CLASSES.get(cls)
+    if frozen_class is None:
+        frozen_class = type(
+            f"Frozen{cls.__name__}",
+            (_FrozenNode, cls),
+            {"__slots__": (), "_unfrozen_class": cls},
+        )
+        _FROZEN_CLASSES[cls] = frozen_class
+    return frozen_class
+
+
+# Builds the LeafNode for each TextType, so conversion is one dict lookup
+# instead of walking a match statement for every node
+_TEXT_NODE_CONVERTERS = {
+    TextType.TEXT: lambda node: LeafNode(None, node.text),
+    TextType.BOLD: lambda node: LeafNode("b", node.text),
+    TextType.ITALIC: lambda node: LeafNode("i", node.text),
+    TextType.CODE: lambda node: LeafNode("code", node.text),
+    TextType.LINK: lambda node: LeafNode("a", node.text, {"href": node.url}),
+    TextType.IMAGE: lambda node: LeafNode("img", "", {"src": node.url, "alt": node.text}),
+}
+
 
 def text_node_to_html_node(text_node):
-    match text_node.text_type:
-        case TextType.TEXT:
-            return LeafNode(None, text_node.text)
-        case TextType.BOLD:
-            return LeafNode("b", text_node.text)
-        case TextType.ITALIC:
-            return LeafNode("i", text_node.text)
-        case TextType.CODE:
-            return LeafNode("code", text_node.text)
-        case TextType.LINK:
-            return LeafNode("a", text_node.text, {"href": text_node.url})
-        case TextType.IMAGE:
-            return LeafNode("img", "", {"src": text_node.url, "alt": text_node.text})
-        case _:
+    # A FrozenTextNode is converted once, to a frozen LeafNode that keeps
+    # its HTML, and every later conversion shares that leaf
+    if type(text_node) is FrozenTextNode:
+        leaf = text_node._leaf
+        if leaf is None:
+            leaf = _convert_text_node(text_node).freeze()
+            object.__setattr__(text_node, "_leaf", leaf)
+        return leaf
+    return _convert_text_node(text_node)
+
+
+def _convert_text_node(text_node):
+    converter = _TEXT_NODE_CONVERTERS.get(text_node.text_type)
+    if converter is None:
+        raise ValueError(f"Invalid TextType: {text_node.text_type}")
+    return converter(text_node)
+
+
+@instrumented("convert", _count_nodes)
+def text_nodes_to_html_nodes(text_nodes):
+    """
+    Converts a list of TextNodes to LeafNodes in one call.
+
+    Args:
+        text_nodes: An iterable of TextNodes.
+
+    Returns:
+        A list of LeafNodes, in the same order.
+    """
+    converters = _TEXT_NODE_CONVERTERS
+    html_nodes = []
+    append = html_nodes.append
+    for text_node in text_nodes:
+        if type(text_node) is FrozenTextNode:
+            append(text_node_to_html_node(text_node))
+            continue
+        converter = converters.get(text_node.text_type)
+        if converter is None:
             raise ValueError(f"Invalid TextType: {text_node.text_type}")
-        
-def split_nodes_delimiter(old_nodes, delimiter, text_type):
-    
-    
+        append(converter(text_node))
+    return html_nodes
+
+
+@instrumented("render", _count_bytes)
+def render_html(node):
+    """
+    Serializes node to an HTML string, reported to the stage hook as the
+    render stage.
+    """
+    return node.to_html()
 
+
+@instrumented("split_delimiter", _count_nodes)
+def split_nodes_delimiter(old_nodes, delimiter, text_type):
     new_nodes = []
+    delimiter_length = len(delimiter)
     
     for old_node in old_nodes:
         # If not a TEXT node, keep as is
@@ -91,46 +446,240 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
             new_nodes.append(old_node)
             continue
             
-        # Process TEXT nodes to find delimiters
+        # Process TEXT nodes to find delimiters, moving a cursor through the
+        # text rather than re-slicing the remaining portion on every match
         text = old_node.text
-        result = []
+        current_index = 0
         
-        # Continue searching until no more delimiters
-        while delimiter in text:
+        while True:
             # Find opening delimiter
-            start_index = text.find(delimiter)
+            start_index = text.find(delimiter, current_index)
             if start_index == -1:
                 break
                 
             # Find closing delimiter
-            end_index = text.find(delimiter, start_index + len(delimiter))
+            end_index = text.find(delimiter, start_index + delimiter_length)
             if end_index == -1:
                 raise ValueError(f"Closing delimiter not found: {delimiter}")
                 
-            # Extract parts
-            before_text = text[:start_index]
-            delimited_text = text[start_index + len(delimiter):end_index]
-            
             # Add before_text if not empty
-            if before_text:
-                result.append(TextNode(before_text, TextType.TEXT))
+            if start_index > current_index:
+                new_nodes.append(TextNode(text[current_index:start_index], TextType.TEXT))
                 
             # Add delimited text with specified type
-            result.append(TextNode(delimited_text, text_type))
+            new_nodes.append(
+                TextNode(text[start_index + delimiter_length:end_index], text_type)
+            )
             
-            # Update text to remaining portion
-            text = text[end_index + len(delimiter):]
+            # Move past the closing delimiter
+            current_index = end_index + delimiter_length
          
         # Add any remaining text
-        
-        result.append(TextNode(text, TextType.TEXT))
-            
-        # Add all newly created nodes to the result
-        new_nodes.extend(result)
+        new_nodes.append(TextNode(text[current_index:], TextType.TEXT))
             
     return new_nodes
 
 
+# A [text](url) with no brackets or parentheses inside: by far the usual
+# case, for links and, with a "!" before it, images. Being balanced and
+# holding no other bracket, it pairs up the same whether matched whole or
+# one bracket at a time.
+_SIMPLE_CONSTRUCT_PATTERN = re.compile(r"\[([^\[\]()]*)\]\(([^\[\]()]*)\)")
+_SIMPLE_CONSTRUCT_BYTES_PATTERN = re.compile(_SIMPLE_CONSTRUCT_PATTERN.pattern.encode())
+
+# Jumps between the characters the bracket matcher pairs up, taking a
+# simple construct whole. Starting on a character class lets the regex
+# engine skip ahead to the next bracket.
+_BRACKET_PATTERN = re.compile(r"[\[\]()](?:(?<=\[)([^\[\]()]*)\]\([^\[\]()]*\))?")
+_BRACKET_BYTES_PATTERN = re.compile(_BRACKET_PATTERN.pattern.encode())
+
+
+class BracketTable():
+    """
+    The brackets and parentheses of a text paired up in a single pass, so
+    every link and image in it can be found in O(n) overall however the
+    brackets are nested or left unclosed.
+
+    Each ] or ) closes the nearest unclosed [ or ( before it. A [ whose
+    pair is directly followed by a ( with a pair of its own opens a link,
+    or an image when a ! comes right before it. The link text and URL can
+    hold balanced brackets and parentheses, as in [a[0]](/wiki/A_(b)).
+    Images take precedence: a link with an image anywhere inside it is not
+    a link, matching split_nodes_image running before split_nodes_link.
+
+    The text may also be UTF-8 bytes or an mmap, giving byte offsets.
+
+    Args:
+        text: The markdown text.
+        start: Where the part of text to pair up starts.
+        end: Where it ends; the end of text when None.
+    """
+    __slots__ = ("text", "bang", "start", "end", "opens", "closing", "urls", "images")
+
+    def __init__(self, text, start=0, end=None):
+        is_text = isinstance(text, str)
+        pattern = _BRACKET_PATTERN if is_text else _BRACKET_BYTES_PATTERN
+        self.bang = bang = "!" if is_text else b"!"
+        open_bracket, close_bracket, open_paren = ("[", "]", "(") if is_text else (b"[", b"]", b"(")
+        end = len(text) if end is None else end
+        self.text = text
+        self.start = start
+        self.end = end
+        # Offsets of every [, in order
+        self.opens = opens = []
+        # [ offset -> its ]
+        self.closing = closing = {}
+        # [ offset -> the ) ending its link or image, for every one found
+        self.urls = urls = {}
+        # Offsets of the [ of every image, in order
+        self.images = images = []
+        # ( offset -> its ), for parentheses outside simple constructs
+        parens = {}
+        # Brackets outside simple constructs, still open and then all of them
+        brackets = []
+        loose = []
+        open_parens = []
+
+        for match in pattern.finditer(text, start, end):
+            index = match.start()
+            label_end = match.end(1)
+            if label_end != -1:
+                opens.append(index)
+                closing[index] = label_end
+                urls[index] = match.end() - 1
+                if index > start and text[index - 1:index] == bang:
+                    images.append(index)
+                continue
+            char = text[index:index + 1]
+            if char == open_bracket:
+                opens.append(index)
+                brackets.append(index)
+                loose.append(index)
+            elif char == open_paren:
+                open_parens.append(index)
+            elif char == close_bracket:
+                if brackets:
+                    closing[brackets.pop()] = index
+            elif open_parens:
+                parens[open_parens.pop()] = index
+
+        if not loose:
+            return
+        # Links and images that nest brackets or parentheses
+        for index in loose:
+            close = closing.get(index)
+            if close is None:
+                continue
+            url_close = parens.get(close + 1)
+            if url_close is None:
+                continue
+            urls[index] = url_close
+            if index > start and text[index - 1:index] == bang:
+                images.append(index)
+        images.sort()
+
+    def image(self, index):
+        """
+        Returns the ) ending the image whose [ is at index, or None.
+        """
+        url_close = self.urls.get(index)
+        if url_close is None or index <= self.start or self.text[index - 1:index] != self.bang:
+            return None
+        return url_close
+
+    def link(self, index):
+        """
+        Returns the ) ending the link whose [ is at index, or None.
+        """
+        url_close = self.urls.get(index)
+        if url_close is None or self.text[index - 1:index] == self.bang:
+            return None
+        # Any image inside would be split out first
+        images = self.images
+        position = bisect.bisect_right(images, index)
+        if position < len(images) and images[position] < url_close:
+            return None
+        return url_close
+
+    def iter_images(self):
+        """
+        Yields (start, end, alt start, alt end, URL start, URL end) offsets
+        for each image, left to right, skipping those inside another.
+        """
+        position = self.start
+        closing = self.closing
+        urls = self.urls
+        for index in self.images:
+            if index - 1 < position:
+                continue
+            url_close = urls[index]
+            close = closing[index]
+            yield index - 1, url_close + 1, index + 1, close, close + 2, url_close
+            position = url_close + 1
+
+    def iter_links(self):
+        """
+        Yields (start, end, text start, text end, URL start, URL end)
+        offsets for each link, left to right, skipping those inside another.
+        """
+        position = self.start
+        closing = self.closing
+        link = self.link
+        for index in self.opens:
+            if index < position:
+                continue
+            url_close = link(index)
+            if url_close is None:
+                continue
+            close = closing[index]
+            yield index, url_close + 1, index + 1, close, close + 2, url_close
+            position = url_close + 1
+
+
+def _find_constructs(text, images, start=0, end=None):
+    # Lists (start, end, text start, text end, URL start, URL end) offsets
+    # for each image, or each link, in text[start:end]
+    end = len(text) if end is None else end
+    is_text = isinstance(text, str)
+    # Every image holds "![" and every link "["
+    needle = "![" if images else "["
+    if text.find(needle if is_text else needle.encode(), start, end) == -1:
+        return []
+    # str and bytes can count brackets; an mmap can't, so goes to the table
+    if hasattr(text, "count"):
+        if is_text:
+            pattern, bang, (open_bracket, close_bracket, open_paren, close_paren) = (
+                _SIMPLE_CONSTRUCT_PATTERN, "!", "[]()"
+            )
+        else:
+            pattern, bang, open_bracket, close_bracket, open_paren, close_paren = (
+                _SIMPLE_CONSTRUCT_BYTES_PATTERN, b"!", b"[", b"]", b"(", b")"
+            )
+        matches = list(pattern.finditer(text, start, end))
+        count = len(matches)
+        # When every bracket belongs to a simple construct nothing nests, so
+        # those are the answer and no BracketTable is needed
+        if (
+            text.count(open_bracket, start, end) == count
+            and text.count(close_bracket, start, end) == count
+            and text.count(open_paren, start, end) == count
+            and text.count(close_paren, start, end) == count
+        ):
+            found = []
+            for match in matches:
+                index = match.start()
+                # A "!" just before the span still stops a link, like it
+                # does in unsplit text, but can't start an image
+                if (text[index - 1:index] == bang) != images or (images and index == start):
+                    continue
+                text_start, text_end = match.span(1)
+                url_start, url_end = match.span(2)
+                found.append((index - images, match.end(), text_start, text_end, url_start, url_end))
+            return found
+    table = BracketTable(text, start, end)
+    return list(table.iter_images() if images else table.iter_links())
+
+
 def extract_markdown_images(text):
     """
     Extracts markdown images from text and returns a list of tuples.
@@ -142,9 +691,7 @@ def extract_markdown_images(text):
     Returns:
         A list of tuples, where each tuple contains the alt text and URL of an image.
     """
-    image_pattern = r"!\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    matches = re.findall(image_pattern, text)
-    return matches
+    return [(alt, url) for _, _, alt, url in iter_markdown_images(text)]
 
 
 def extract_markdown_links(text):
@@ -158,11 +705,50 @@ def extract_markdown_links(text):
     Returns:
         A list of tuples, where each tuple contains the anchor text and URL of a link.
     """
-    link_pattern = r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    matches = re.findall(link_pattern, text)
-    return matches
+    return [(anchor_text, url) for _, _, anchor_text, url in iter_markdown_links(text)]
+
+
+def iter_markdown_images(text):
+    """
+    Finds markdown images in text along with where they sit.
+
+    Args:
+        text: The markdown text to search.
+
+    Yields:
+        Tuples of (start, end, alt text, URL), where start and end are the
+        offsets of the whole image markdown in text.
+    """
+    for start, end, alt_start, alt_end, url_start, url_end in _find_constructs(text, True):
+        yield start, end, text[alt_start:alt_end], text[url_start:url_end]
+
+
+def iter_markdown_links(text):
+    """
+    Finds markdown links in text along with where they sit.
 
+    Args:
+        text: The markdown text to search.
+
+    Yields:
+        Tuples of (start, end, anchor text, URL), where start and end are the
+        offsets of the whole link markdown in text.
+    """
+    for start, end, text_start, text_end, url_start, url_end in _find_constructs(text, False):
+        yield start, end, text[text_start:text_end], text[url_start:url_end]
+
+
+@instrumented("split_image", _count_nodes)
 def split_nodes_image(old_nodes):
+    return _split_nodes_matches(old_nodes, iter_markdown_images, TextType.IMAGE)
+
+
+@instrumented("split_link", _count_nodes)
+def split_nodes_link(old_nodes):
+    return _split_nodes_matches(old_nodes, iter_markdown_links, TextType.LINK)
+
+
+def _split_nodes_matches(old_nodes, find_matches, text_type):
     new_nodes = []
     
     for old_node in old_nodes:
@@ -171,32 +757,24 @@ def split_nodes_image(old_nodes):
             new_nodes.append(old_node)
             continue
         
-        # Check if there are any images to extract
-        images = extract_markdown_images(old_node.text)
-        if not images:
-            new_nodes.append(old_node)
-            continue
-        
-        # Process the text with images
         text = old_node.text
         current_index = 0
         
-        # For each image found
-        for alt_text, url in images:
-            image_markdown = f"![{alt_text}]({url})"
-            image_index = text.find(image_markdown, current_index)
-            
-            # Add text before the image if any
-            if image_index > current_index:
+        # Slice around each match using the offsets the regex already found
+        for start_index, end_index, anchor_text, url in find_matches(text):
+            # Add text before the match if any
+            if start_index > current_index:
                 new_nodes.append(
-                    TextNode(text[current_index:image_index], TextType.TEXT)
+                    TextNode(text[current_index:start_index], TextType.TEXT)
                 )
             
-            # Add the image node
-            new_nodes.append(TextNode(alt_text, TextType.IMAGE, url))
-            
-            # Move past this image
-            current_index = image_index + len(image_markdown)
+            new_nodes.append(TextNode(anchor_text, text_type, url))
+            current_index = end_index
+        
+        # Keep the node itself when nothing matched
+        if current_index == 0:
+            new_nodes.append(old_node)
+            continue
         
         # Add remaining text only if not empty
         remaining_text = text[current_index:]
@@ -206,45 +784,163 @@ def split_nodes_image(old_nodes):
     return new_nodes
 
 
-def split_nodes_link(old_nodes):
-    new_nodes = []
-    
-    for old_node in old_nodes:
-        # If not a TEXT node, keep as is
-        if old_node.text_type != TextType.TEXT:
-            new_nodes.append(old_node)
+def chained_text_to_textnodes(text):
+    """
+    Splits a line of markdown into TextNodes by running each split_nodes_*
+    pass in turn: code, bold and italic, then images and links.
+
+    This is the chain text_to_textnodes replaces, kept as the reference
+    the tests and benchmarks compare it with.
+
+    Args:
+        text: The markdown text to split.
+
+    Returns:
+        A list of TextNodes, including the empty TEXT nodes the
+        delimiter passes leave behind.
+    """
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = split_nodes_image(nodes)
+    return split_nodes_link(nodes)
+
+
+# Inline delimiters recognised by the tokenizer, mapped to the type of node
+# their contents become.
+INLINE_DELIMITERS = {
+    "`": TextType.CODE,
+    "**": TextType.BOLD,
+    "_": TextType.ITALIC,
+}
+
+_INLINE_TOKEN_PATTERN = re.compile(r"`|\*\*|_|!?\[")
+
+
+@instrumented("tokenize", _count_nodes)
+def text_to_textnodes(text):
+    """
+    Splits a line of markdown into TextNodes in a single scan.
+
+    Produces the same nodes as running split_nodes_delimiter for code, bold
+    and italic followed by split_nodes_image and split_nodes_link, minus the
+    empty TEXT nodes that chain leaves behind. Links and images are taken
+    verbatim, so delimiters inside them are not split.
+
+    Args:
+        text: The markdown text to tokenize.
+
+    Returns:
+        A list of TextNodes.
+    """
+    return _tokenize_inline(text, TextNode)
+
+
+# Tags of the inline TextTypes that carry no URL
+_INLINE_TAGS = {
+    TextType.TEXT: None,
+    TextType.BOLD: "b",
+    TextType.ITALIC: "i",
+    TextType.CODE: "code",
+}
+
+
+def _make_leaf(text, text_type, url=None):
+    # Builds the LeafNode for a piece of inline text directly, for
+    # text_to_children which never makes the TextNodes
+    if url is None:
+        return LeafNode(_INLINE_TAGS[text_type], text)
+    if text_type == TextType.LINK:
+        return LeafNode("a", text, {"href": url})
+    return LeafNode("img", "", {"src": url, "alt": text})
+
+
+@instrumented("inline", _count_nodes)
+def text_to_children(text):
+    """
+    Turns a line of markdown straight into LeafNodes.
+
+    The same as text_nodes_to_html_nodes(text_to_textnodes(text)), but the
+    leaves are built as the text is scanned, with no TextNodes or list in
+    between.
+
+    Args:
+        text: The markdown text to convert.
+
+    Returns:
+        A list of LeafNodes.
+    """
+    return _tokenize_inline(text, _make_leaf)
+
+
+def _tokenize_inline(text, make_node):
+    # The scan behind text_to_textnodes and text_to_children; make_node is
+    # called as make_node(text, text_type[, url]) for each node found
+    nodes = []
+    append = nodes.append
+    start = 0
+    position = 0
+    length = len(text)
+    search = _INLINE_TOKEN_PATTERN.search
+    match_simple = _SIMPLE_CONSTRUCT_PATTERN.match
+    brackets = None
+
+    while position < length:
+        # Jump straight to the next character that could open a construct
+        match = search(text, position)
+        if match is None:
+            break
+        token = match.group()
+        index = match.start()
+
+        if token in INLINE_DELIMITERS:
+            end_index = text.find(token, index + len(token))
+            if end_index == -1:
+                raise ValueError(f"Closing delimiter not found: {token}")
+            if index > start:
+                append(make_node(text[start:index], TextType.TEXT))
+            append(make_node(text[index + len(token):end_index], INLINE_DELIMITERS[token]))
+            start = position = end_index + len(token)
             continue
-        
-        # Check if there are any links to extract
-        links = extract_markdown_links(old_node.text)
-        if not links:
-            new_nodes.append(old_node)
+
+        if token == "![":
+            text_type = TextType.IMAGE
+            bracket = index + 1
+        else:
+            text_type = TextType.LINK
+            bracket = index
+
+        construct = match_simple(text, bracket)
+        if construct is not None:
+            if index > start:
+                append(make_node(text[start:index], TextType.TEXT))
+            append(make_node(construct.group(1), text_type, construct.group(2)))
+            start = position = construct.end()
             continue
-        
-        # Process the text with links
-        text = old_node.text
-        current_index = 0
-        
-        # For each link found
-        for link_text, url in links:
-            link_markdown = f"[{link_text}]({url})"
-            link_index = text.find(link_markdown, current_index)
-            
-            # Add text before the link if any
-            if link_index > current_index:
-                new_nodes.append(
-                    TextNode(text[current_index:link_index], TextType.TEXT)
-                )
-            
-            # Add the link node
-            new_nodes.append(TextNode(link_text, TextType.LINK, url))
-            
-            # Move past this link
-            current_index = link_index + len(link_markdown)
-        
-        # Add remaining text only if not empty
-        remaining_text = text[current_index:]
-        if remaining_text:
-            new_nodes.append(TextNode(remaining_text, TextType.TEXT))
-    
-    return new_nodes
\ No newline at end of file
+
+        # Anything else nests or is unmatched, which takes the brackets of
+        # the whole text paired up, once
+        if brackets is None:
+            brackets = BracketTable(text)
+        if text_type == TextType.IMAGE:
+            url_close = brackets.image(bracket)
+        else:
+            url_close = brackets.link(bracket)
+
+        # An unmatched bracket is plain text
+        if url_close is None:
+            position = match.end()
+            continue
+
+        close = brackets.closing[bracket]
+        if index > start:
+            append(make_node(text[start:index], TextType.TEXT))
+        append(make_node(text[bracket + 1:close], text_type, text[close + 2:url_close]))
+        start = position = url_close + 1
+
+    # Add remaining text only if not empty
+    if start < length:
+        append(make_node(text[start:], TextType.TEXT))
+
+    return nodes
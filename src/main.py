@@ -1,10 +1,149 @@
-from textnode import TextNode, TextType
+import argparse
+import os
 
-def main():
-    textnode = TextNode("This is some anchor text", TextType.LINK, "https://www.boot.dev")
-    
-    print(textnode)
+from blocks import render_inline, set_inline_memo
+from build import build_site, merge_shards, render_content
+from compressed import AVAILABLE_FORMATS
+from profiling import BuildProfile
+from rendercache import MemoCache, RenderCache
+from watch import watch
 
 
+# Used when it exists; the built-in template is used otherwise
+DEFAULT_TEMPLATE_PATH = "template.html"
 
-main()    
\ No newline at end of file
+
+def parse_shard(value):
+    # "I/N", building shard I of N counted from 0
+    index, _, count = value.partition("/")
+    try:
+        shard = (int(index), int(count))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected I/N, got {value!r}")
+    if not 0 <= shard[0] < shard[1]:
+        raise argparse.ArgumentTypeError(f"shard {shard[0]} is not between 0 and {shard[1] - 1}")
+    return shard
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the static site.")
+    parser.add_argument("--content", default="content", help="directory of markdown pages and assets")
+    parser.add_argument("--output", default="public", help="directory the site is written to")
+    parser.add_argument(
+        "--template",
+        help=f"HTML page template (default {DEFAULT_TEMPLATE_PATH} if it exists, else a built-in one)",
+    )
+    parser.add_argument("--cache", help="directory for the persistent render cache")
+    parser.add_argument(
+        "--cache-max-entries", type=int, default=10000, metavar="N",
+        help="most pages kept in the --cache directory, least recently used removed first (default 10000)",
+    )
+    parser.add_argument(
+        "--cache-max-bytes", type=int, default=512 * 1024 * 1024, metavar="N",
+        help="most bytes of HTML kept in the --cache directory (default 512 MiB)",
+    )
+    parser.add_argument("--force", action="store_true", help="rebuild every page")
+    parser.add_argument(
+        "--inline-memo", type=int, metavar="N",
+        help="remember the inline HTML of up to N repeated paragraphs, per process",
+    )
+    parser.add_argument(
+        "--inline-memo-max-bytes", type=int, metavar="N",
+        help="most bytes of markdown and HTML the --inline-memo keeps, per process (default no limit)",
+    )
+    parser.add_argument("--jobs", type=int, default=1, metavar="N", help="render pages with N worker processes")
+    parser.add_argument(
+        "--async-io", action="store_true",
+        help="overlap reading and writing files with rendering, for slow or network storage",
+    )
+    parser.add_argument("--watch", action="store_true", help="rebuild on every change and serve a preview")
+    parser.add_argument("--port", type=int, default=8000, help="port of the --watch preview server")
+    parser.add_argument("--poll", action="store_true", help="make --watch poll for changes instead of using inotify")
+    parser.add_argument(
+        "--profile", type=int, nargs="?", const=10, metavar="N",
+        help="time each build stage and list the N slowest pages (default 10)",
+    )
+    parser.add_argument(
+        "--compress", action="store_true",
+        help="also write a .gz (and .br, with brotli installed) of every page, skipping unchanged pages",
+    )
+    parser.add_argument(
+        "--shard", type=parse_shard, metavar="I/N",
+        help="build only shard I of N (counted from 0) into --output, for one of N workers",
+    )
+    parser.add_argument(
+        "--merge", nargs="+", metavar="SHARD_DIR",
+        help="assemble the outputs of every --shard build into --output instead of building",
+    )
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.cache_max_entries < 1 or args.cache_max_bytes < 1:
+        parser.error("--cache-max-entries and --cache-max-bytes must be at least 1")
+    # Profiled pages are built in this process, one after another, which
+    # would time something other than the pipeline asked for
+    if args.profile is not None and args.async_io:
+        parser.error("--profile can't be combined with --async-io")
+    if args.inline_memo_max_bytes is not None:
+        if not args.inline_memo:
+            parser.error("--inline-memo-max-bytes needs --inline-memo")
+        if args.inline_memo_max_bytes < 1:
+            parser.error("--inline-memo-max-bytes must be at least 1")
+    if args.template is None:
+        template = DEFAULT_TEMPLATE_PATH if os.path.exists(DEFAULT_TEMPLATE_PATH) else None
+    elif os.path.exists(args.template):
+        template = args.template
+    else:
+        parser.error(f"--template {args.template} does not exist")
+    # Without its pages a build would remove every output it made before
+    if not args.merge and not os.path.isdir(args.content):
+        parser.error(f"--content {args.content} is not a directory")
+
+    render_cache = None
+    if args.cache:
+        render_cache = RenderCache(args.cache, render_content, args.cache_max_entries, args.cache_max_bytes)
+
+    inline_memo = None
+    if args.inline_memo:
+        inline_memo = MemoCache(render_inline, args.inline_memo, args.inline_memo_max_bytes)
+        set_inline_memo(inline_memo)
+
+    if args.watch:
+        watch(args.content, args.output, template, args.port, args.poll)
+        return
+
+    if args.merge:
+        result = merge_shards(args.merge, args.output)
+        print(
+            f"Merged {len(args.merge)} shards: copied {len(result['built'])},"
+            f" removed {len(result['removed'])}, {result['skipped']} up to date"
+        )
+        return
+
+    compress = AVAILABLE_FORMATS if args.compress else None
+    profile = BuildProfile() if args.profile is not None else None
+    if profile:
+        with profile:
+            result = build_site(
+                args.content, args.output, template, render_cache, args.force, args.jobs, profile,
+                shard=args.shard, compress=compress,
+            )
+    else:
+        result = build_site(
+            args.content, args.output, template, render_cache, args.force, args.jobs,
+            async_io=args.async_io, shard=args.shard, compress=compress,
+        )
+    print(
+        f"Built {len(result['built'])}, removed {len(result['removed'])},"
+        f" {result['skipped']} up to date"
+    )
+    if render_cache:
+        print(f"Render cache: {render_cache.stats()}")
+    if inline_memo:
+        print(f"Inline memo: {inline_memo.stats()}")
+    if profile:
+        print(profile.report(args.profile))
+
+
+if __name__ == "__main__":
+    main()
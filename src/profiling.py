@@ -0,0 +1,91 @@
+import time
+from contextlib import contextmanager
+
+from htmlnode import set_stage_hook
+
+
+def _new_totals():
+    return {"calls": 0, "seconds": 0.0, "nodes": 0, "bytes": 0}
+
+
+class BuildProfile():
+    """
+    Collects per-stage timings for a build through the htmlnode stage hook.
+
+    Totals are kept for each stage across the whole build and, while a
+    page is being built inside page(), for that page as well.
+
+    Use as a context manager to install the hook for the duration:
+
+        with BuildProfile() as profile:
+            build_site(..., profile=profile)
+        print(profile.report())
+    """
+
+    def __init__(self):
+        # Stage name -> totals
+        self.stages = {}
+        # Page -> {"seconds": wall time, "stages": stage name -> totals}
+        self.pages = {}
+        self.current = None
+        self.previous_hook = None
+
+    def __enter__(self):
+        self.previous_hook = set_stage_hook(self.record)
+        return self
+
+    def __exit__(self, *exc_info):
+        set_stage_hook(self.previous_hook)
+
+    def record(self, stage, seconds, nodes, size):
+        targets = [self.stages]
+        if self.current is not None:
+            targets.append(self.current["stages"])
+        for stages in targets:
+            totals = stages.get(stage)
+            if totals is None:
+                totals = stages[stage] = _new_totals()
+            totals["calls"] += 1
+            totals["seconds"] += seconds
+            totals["nodes"] += nodes
+            totals["bytes"] += size
+
+    @contextmanager
+    def page(self, name):
+        """
+        Attributes the stages run inside the with block to page name and
+        times the block as the page's wall time.
+        """
+        self.current = {"seconds": 0.0, "stages": {}}
+        self.pages[name] = self.current
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.current["seconds"] = time.perf_counter() - start
+            self.current = None
+
+    def slowest_pages(self, top=10):
+        ranked = sorted(self.pages.items(), key=lambda item: item[1]["seconds"], reverse=True)
+        return ranked[:top]
+
+    def report(self, top=10):
+        """
+        Formats the stage totals and the top slowest pages as text.
+        """
+        lines = [f"{'stage':<16} {'calls':>8} {'ms':>10} {'nodes':>10} {'bytes':>12}"]
+        for stage, totals in sorted(self.stages.items(), key=lambda item: -item[1]["seconds"]):
+            lines.append(
+                f"{stage:<16} {totals['calls']:>8} {totals['seconds'] * 1000:>10.2f}"
+                f" {totals['nodes']:>10} {totals['bytes']:>12}"
+            )
+        if self.pages:
+            lines.append("")
+            lines.append(f"Slowest {min(top, len(self.pages))} of {len(self.pages)} pages:")
+            for name, page in self.slowest_pages(top):
+                breakdown = ", ".join(
+                    f"{stage} {totals['seconds'] * 1000:.2f}"
+                    for stage, totals in sorted(page["stages"].items())
+                )
+                lines.append(f"{page['seconds'] * 1000:10.2f} ms  {name}  ({breakdown or 'cached'})")
+        return "\n".join(lines)
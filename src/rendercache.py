@@ -0,0 +1,199 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+from htmlnode import PARSER_VERSION
+
+
+class _LRUCache():
+    # What RenderCache and MemoCache share: the hit, miss and eviction
+    # counts and the LRU order and sizes of the entries, which subclasses
+    # store however they like and drop in _discard()
+    def __init__(self, render, max_entries=None, max_bytes=None):
+        self.render_source = render
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.total_bytes = 0
+        # Key -> size in bytes, least recently used first
+        self.entries = OrderedDict()
+
+    def _hit(self, key):
+        self.entries.move_to_end(key)
+        self.hits += 1
+
+    def _forget(self, key):
+        self.total_bytes -= self.entries.pop(key, 0)
+
+    def _add(self, key, size):
+        self._forget(key)
+        self.entries[key] = size
+        self.total_bytes += size
+        self.evict()
+
+    def _discard(self, key):
+        raise NotImplementedError
+
+    def render(self, source):
+        """
+        Returns the HTML for source, rendering and storing it on a miss.
+        """
+        html = self.get(source)
+        if html is None:
+            html = self.render_source(source)
+            self.put(source, html)
+        return html
+
+    def evict(self):
+        while self.entries and (
+            (self.max_entries is not None and len(self.entries) > self.max_entries)
+            or (self.max_bytes is not None and self.total_bytes > self.max_bytes)
+        ):
+            key, size = self.entries.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            self._discard(key)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class RenderCache(_LRUCache):
+    """
+    A persistent cache of rendered HTML, keyed by a hash of the markdown
+    source and the parser version.
+
+    Entries live as one file per key in a directory, so the cache survives
+    between builds. Once the cache grows past max_entries or max_bytes the
+    least recently used entries are removed. File modification times record
+    recency, which lets a fresh process pick up the LRU order.
+
+    Args:
+        directory: Where cached HTML files are stored.
+        render: Function turning markdown source text into an HTML string.
+        max_entries: Most entries to keep, or None for no limit.
+        max_bytes: Most bytes of HTML to keep, or None for no limit.
+        version: Mixed into every key so a parser change misses the cache.
+    """
+
+    def __init__(self, directory, render, max_entries=None, max_bytes=None, version=PARSER_VERSION):
+        super().__init__(render, max_entries, max_bytes)
+        self.directory = directory
+        self.version = version
+        os.makedirs(directory, exist_ok=True)
+        self.reload()
+
+    def reload(self):
+        """
+        Rebuilds the index from the files in the directory, picking up the
+        entries that other processes sharing it added or removed.
+        """
+        existing = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(".html"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                existing.append((stat.st_mtime_ns, entry.name[:-5], stat.st_size))
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        for _, key, size in sorted(existing):
+            self.entries[key] = size
+            self.total_bytes += size
+
+    def key(self, source):
+        digest = hashlib.sha256(self.version.encode())
+        digest.update(b"\0")
+        digest.update(source.encode())
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.html")
+
+    def get(self, source):
+        key = self.key(source)
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        path = self.path(key)
+        try:
+            with open(path, encoding="utf-8") as file:
+                html = file.read()
+        except FileNotFoundError:
+            # Removed behind our back, e.g. by another build sharing the cache
+            self._forget(key)
+            self.misses += 1
+            return None
+        self._hit(key)
+        os.utime(path)
+        return html
+
+    def put(self, source, html):
+        key = self.key(source)
+        path = self.path(key)
+        # Write to a temporary file first so readers never see a partial entry
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            file.write(html)
+        os.replace(temporary_path, path)
+        self._add(key, os.path.getsize(path))
+
+    def _discard(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+
+class MemoCache(_LRUCache):
+    """
+    An in-process LRU memo of rendered HTML, keyed by the markdown source
+    text itself.
+
+    Meant for the short sources that repeat across thousands of pages,
+    such as a boilerplate sentence or a list of links, where hashing and
+    file I/O would cost more than rendering. An entry's size is the UTF-8
+    bytes of its source and HTML.
+
+    Args:
+        render: Function turning markdown source text into an HTML string.
+        max_entries: Most entries to keep, or None for no limit.
+        max_bytes: Most bytes of source and HTML to keep, or None for no
+            limit.
+    """
+
+    def __init__(self, render, max_entries=None, max_bytes=None):
+        super().__init__(render, max_entries, max_bytes)
+        # Source -> HTML, in no particular order; entries keeps the LRU order
+        self.html = {}
+
+    def get(self, source):
+        html = self.html.get(source)
+        if html is None:
+            self.misses += 1
+            return None
+        self._hit(source)
+        return html
+
+    def put(self, source, html):
+        self.html[source] = html
+        self._add(source, len(source.encode()) + len(html.encode()))
+
+    def _discard(self, source):
+        del self.html[source]
+
+    def clear(self):
+        self.entries.clear()
+        self.html.clear()
+        self.total_bytes = 0
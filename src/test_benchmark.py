@@ -0,0 +1,46 @@
+import unittest
+
+from benchmark import compare_results
+
+
+class TestCompareResults(unittest.TestCase):
+    def test_regression_over_threshold(self):
+        baseline = {
+            "inline: fast": {"value": 1.0, "unit": "s"},
+            "inline: slow": {"value": 1.0, "unit": "s"},
+        }
+        current = {
+            "inline: fast": {"value": 1.1, "unit": "s"},
+            "inline: slow": {"value": 1.5, "unit": "s"},
+        }
+        changes, regressions = compare_results(baseline, current, 0.2)
+        self.assertEqual(len(changes), 2)
+        self.assertEqual(regressions, ["inline: slow"])
+
+    def test_reference_measurements_not_gated(self):
+        baseline = {
+            "render: old renderer": {"value": 1.0, "unit": "s"},
+            "render: renderer": {"value": 1.0, "unit": "s"},
+        }
+        current = {
+            "render: old renderer": {"value": 2.0, "unit": "s", "reference": True},
+            "render: renderer": {"value": 2.0, "unit": "s"},
+        }
+        changes, regressions = compare_results(baseline, current, 0.2)
+        self.assertEqual(len(changes), 2)
+        self.assertEqual(regressions, ["render: renderer"])
+
+    def test_unmatched_measurements_ignored(self):
+        baseline = {
+            "memory: peak": {"value": 100, "unit": "bytes"},
+            "inline: gone": {"value": 1.0, "unit": "s"},
+        }
+        current = {
+            "memory: peak": {"value": 900, "unit": "s"},
+            "inline: new": {"value": 5.0, "unit": "s"},
+        }
+        self.assertEqual(compare_results(baseline, current, 0.2), ([], []))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+import io
+import unittest
+
+from blocks import (
+    BlockType,
+    block_to_block_type,
+    iter_block_nodes,
+    iter_blocks,
+    markdown_lines,
+    markdown_batch_to_html,
+    markdown_to_html_node,
+    render_inline,
+    set_inline_memo,
+    write_markdown_html,
+)
+from rendercache import MemoCache
+
+
+class TestIterBlocks(unittest.TestCase):
+    def test_blocks_split_on_blank_lines(self):
+        markdown = """
+This is **bolded** paragraph
+
+This is another paragraph with _italic_ text and `code` here
+This is the same paragraph on a new line
+
+- This is a list
+- with items
+"""
+        self.assertListEqual(
+            [
+                (BlockType.PARAGRAPH, ["This is **bolded** paragraph"]),
+                (
+                    BlockType.PARAGRAPH,
+                    [
+                        "This is another paragraph with _italic_ text and `code` here",
+                        "This is the same paragraph on a new line",
+                    ],
+                ),
+                (BlockType.UNORDERED_LIST, ["- This is a list", "- with items"]),
+            ],
+            list(iter_blocks(markdown.splitlines(keepends=True))),
+        )
+
+    def test_code_fence_keeps_blank_lines(self):
+        lines = ["```\n", "first\n", "\n", "second\n", "```\n", "after\n"]
+        self.assertListEqual(
+            [
+                (BlockType.CODE, ["```", "first", "", "second", "```"]),
+                (BlockType.PARAGRAPH, ["after"]),
+            ],
+            list(iter_blocks(lines)),
+        )
+
+    def test_blocks_are_yielded_as_they_close(self):
+        consumed = []
+
+        def lines():
+            for line in ["one\n", "\n", "two\n", "\n", "three\n"]:
+                consumed.append(line)
+                yield line
+
+        blocks = iter_blocks(lines())
+        next(blocks)
+        self.assertListEqual(["one\n", "\n"], consumed)
+
+
+class TestBlockToBlockType(unittest.TestCase):
+    def test_types(self):
+        cases = [
+            (["# heading"], BlockType.HEADING),
+            (["###### heading"], BlockType.HEADING),
+            (["####### too deep"], BlockType.PARAGRAPH),
+            (["```", "code", "```"], BlockType.CODE),
+            (["> quote", "> more"], BlockType.QUOTE),
+            (["> quote", "not quote"], BlockType.PARAGRAPH),
+            (["- item", "* item"], BlockType.UNORDERED_LIST),
+            (["1. one", "2. two"], BlockType.ORDERED_LIST),
+            (["1. one", "3. three"], BlockType.PARAGRAPH),
+            (["plain text"], BlockType.PARAGRAPH),
+        ]
+        for lines, block_type in cases:
+            with self.subTest(lines=lines):
+                self.assertEqual(block_to_block_type(lines), block_type)
+
+
+class TestMarkdownToHTMLNode(unittest.TestCase):
+    def test_paragraphs(self):
+        markdown = """
+This is **bolded** paragraph
+text in a p
+tag here
+
+This is another paragraph with _italic_ text and `code` here
+
+"""
+        self.assertEqual(
+            markdown_to_html_node(markdown).to_html(),
+            "<div><p>This is <b>bolded</b> paragraph text in a p tag here</p>"
+            "<p>This is another paragraph with <i>italic</i> text and <code>code</code> here</p></div>",
+        )
+
+    def test_codeblock(self):
+        markdown = """
+```
+This is text that _should_ remain
+the **same** even with inline stuff
+```
+"""
+        self.assertEqual(
+            markdown_to_html_node(markdown).to_html(),
+            "<div><pre><code>This is text that _should_ remain\nthe **same** even with inline stuff\n</code></pre></div>",
+        )
+
+    def test_heading_quote_and_lists(self):
+        markdown = """# Title
+
+## Sub **heading**
+
+> A quote
+> over two lines
+
+- one
+- [two](/two)
+
+1. first
+2. second
+"""
+        self.assertEqual(
+            markdown_to_html_node(markdown).to_html(),
+            "<div><h1>Title</h1><h2>Sub <b>heading</b></h2>"
+            "<blockquote>A quote over two lines</blockquote>"
+            '<ul><li>one</li><li><a href="/two">two</a></li></ul>'
+            "<ol><li>first</li><li>second</li></ol></div>",
+        )
+
+    def test_write_markdown_html_matches_tree(self):
+        markdown = "# Title\n\nSome `code`\n\n- a\n- b\n"
+        stream = io.StringIO()
+        write_markdown_html(io.StringIO(markdown), stream)
+        self.assertEqual(stream.getvalue(), markdown_to_html_node(markdown).to_html())
+
+    def test_only_newlines_split_lines(self):
+        # As when the page is streamed from a file opened in text mode
+        markdown = "para one\x0cstill\u2028para\r\nnext\rline"
+        self.assertEqual(
+            markdown_to_html_node(markdown).to_html(),
+            "<div><p>para one\x0cstill\u2028para next line</p></div>",
+        )
+        self.assertEqual(list(markdown_lines(markdown)), ["para one\x0cstill\u2028para\n", "next\n", "line"])
+
+    def test_markdown_batch_to_html(self):
+        markdowns = ["# One\n\nSome **bold**", "", "- a\n- [b](c)\n\n```\ncode\n```"]
+        self.assertListEqual(
+            markdown_batch_to_html(markdowns),
+            [markdown_to_html_node(markdown).to_html() for markdown in markdowns],
+        )
+
+    def test_inline_memo_gives_same_html(self):
+        markdown = "# Title\n\nSee [docs](/docs)\n\n- See [docs](/docs)\n- two\n\n> quote\n\n```\n**raw**\n```"
+        expected = markdown_to_html_node(markdown).to_html()
+        memo = MemoCache(render_inline)
+        previous = set_inline_memo(memo)
+        try:
+            self.assertEqual(markdown_to_html_node(markdown).to_html(), expected)
+            self.assertEqual(markdown_to_html_node(markdown).to_html(), expected)
+        finally:
+            set_inline_memo(previous)
+        self.assertEqual(memo.stats()["misses"], 4)
+        self.assertEqual(memo.stats()["hits"], 6)
+
+    def test_iter_block_nodes(self):
+        nodes = list(iter_block_nodes(["# One\n", "\n", "two\n"]))
+        self.assertListEqual(["<h1>One</h1>", "<p>two</p>"], [node.to_html() for node in nodes])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,412 @@
+import asyncio
+import gzip
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import build
+from build import (
+    MANIFEST_NAME,
+    build_pages_async,
+    build_site,
+    extract_title,
+    merge_shards,
+    render_content,
+    shard_of,
+)
+from blocks import render_inline, set_inline_memo
+from rendercache import MemoCache, RenderCache
+
+
+class TestExtractTitle(unittest.TestCase):
+    def test_extract_title(self):
+        self.assertEqual(extract_title("intro\n# Hello \n"), "Hello")
+        self.assertIsNone(extract_title("## Not a title"))
+
+    def test_extract_title_from_lines(self):
+        self.assertEqual(extract_title(iter(["intro\n", "# Hello\n"])), "Hello")
+
+
+class SiteTestCase(unittest.TestCase):
+    # A small site in a temporary directory, shared with the watch tests
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        root = self.temporary_directory.name
+        self.content = os.path.join(root, "content")
+        self.public = os.path.join(root, "public")
+        self.template = os.path.join(root, "template.html")
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome\n\nTo the **site**")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nA `post`")
+        self.write(os.path.join(self.content, "logo.png"), "image bytes")
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+
+    def read(self, path):
+        with open(path, encoding="utf-8") as file:
+            return file.read()
+
+
+class TestBuildSite(SiteTestCase):
+    def build(self):
+        return build_site(self.content, self.public, self.template)
+
+    def bump_mtime(self, path):
+        # Make sure the change is visible even on coarse mtime clocks
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def test_first_build(self):
+        result = self.build()
+        self.assertEqual(len(result["built"]), 3)
+        self.assertEqual(
+            self.read(os.path.join(self.public, "blog", "post.html")),
+            "<title>Post</title><div><h1>Post</h1><p>A <code>post</code></p></div>",
+        )
+        self.assertEqual(self.read(os.path.join(self.public, "logo.png")), "image bytes")
+        self.assertTrue(os.path.exists(os.path.join(self.public, MANIFEST_NAME)))
+
+    def test_unchanged_rebuild_does_nothing(self):
+        self.build()
+        result = self.build()
+        self.assertListEqual(result["built"], [])
+        self.assertEqual(result["skipped"], 3)
+
+    def test_touched_but_identical_source_is_skipped(self):
+        self.build()
+        self.bump_mtime(os.path.join(self.content, "index.md"))
+        self.assertListEqual(self.build()["built"], [])
+
+    def test_changed_source_rebuilds_only_that_page(self):
+        self.build()
+        source = os.path.join(self.content, "index.md")
+        self.write(source, "# Home\n\nWelcome back")
+        self.bump_mtime(source)
+        result = self.build()
+        self.assertListEqual(result["built"], [os.path.join(self.public, "index.html")])
+        self.assertIn("Welcome back", self.read(os.path.join(self.public, "index.html")))
+
+    def test_changed_template_rebuilds_every_page(self):
+        self.build()
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.bump_mtime(self.template)
+        result = self.build()
+        self.assertListEqual(
+            sorted(result["built"]),
+            [os.path.join(self.public, "blog", "post.html"), os.path.join(self.public, "index.html")],
+        )
+
+    def test_deleted_source_removes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content, "logo.png"))
+        result = self.build()
+        self.assertListEqual(result["removed"], [os.path.join(self.public, "logo.png")])
+        self.assertFalse(os.path.exists(os.path.join(self.public, "logo.png")))
+
+    def test_missing_content_dir_removes_nothing(self):
+        self.build()
+        with self.assertRaises(FileNotFoundError):
+            build_site(os.path.join(self.content, "missing"), self.public, self.template)
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.html")))
+
+    def test_failed_render_keeps_previous_page(self):
+        self.build()
+        index = os.path.join(self.public, "index.html")
+        previous = self.read(index)
+        source = os.path.join(self.content, "index.md")
+        self.write(source, "# Home\n\nSome snake_case text")
+        self.bump_mtime(source)
+        gzip_options = ({"compress": ("gz",)}, {"compress": ("gz",), "force": True})
+        for options in ({}, {"jobs": 2}, {"async_io": True}, *gzip_options):
+            with self.subTest(**options):
+                with self.assertRaises((ValueError, ExceptionGroup)) as caught:
+                    build_site(self.content, self.public, self.template, **options)
+                error = caught.exception
+                if isinstance(error, ExceptionGroup):
+                    # The async pipeline's TaskGroup wraps what it raises
+                    (error,) = error.subgroup(ValueError).exceptions
+                self.assertIn(source, "".join(error.__notes__))
+                self.assertFalse(os.path.exists(index + ".tmp"))
+        self.assertEqual(self.read(index), previous)
+
+    def test_missing_output_is_rebuilt(self):
+        self.build()
+        os.remove(os.path.join(self.public, "index.html"))
+        self.assertListEqual(self.build()["built"], [os.path.join(self.public, "index.html")])
+
+    def add_pages(self, count):
+        for index in range(count):
+            self.write(
+                os.path.join(self.content, "many", f"page{index}.md"),
+                f"# Page {index}\n\nSome **bold** and a [link](/page{index}.html)",
+            )
+
+    def take_serial_pages(self):
+        # Builds serially, then removes and returns the pages it wrote
+        self.build()
+        serial = {}
+        for directory, _, files in os.walk(self.public):
+            for name in files:
+                if name.endswith(".html"):
+                    path = os.path.join(directory, name)
+                    with open(path, "rb") as file:
+                        serial[path] = file.read()
+                    os.remove(path)
+        return serial
+
+    def assert_pages(self, pages):
+        for path, html in pages.items():
+            with open(path, "rb") as file:
+                self.assertEqual(file.read(), html)
+
+    def test_parallel_build_matches_serial(self):
+        self.add_pages(20)
+        serial = self.take_serial_pages()
+        result = build_site(self.content, self.public, self.template, jobs=3)
+        self.assertEqual(sorted(result["built"]), sorted(serial))
+        self.assert_pages(serial)
+
+    def test_async_build_matches_serial(self):
+        self.add_pages(20)
+        serial = self.take_serial_pages()
+        for jobs in (1, 3):
+            with self.subTest(jobs=jobs):
+                result = build_site(self.content, self.public, self.template, jobs=jobs, async_io=True)
+                self.assertEqual(sorted(result["built"]), sorted(serial))
+                self.assert_pages(serial)
+                for path in serial:
+                    os.remove(path)
+
+    def test_async_build_uses_render_cache(self):
+        serial = self.take_serial_pages()
+        with tempfile.TemporaryDirectory() as cache_directory:
+            cache = RenderCache(cache_directory, render_content)
+            build_site(self.content, self.public, self.template, cache, force=True, async_io=True)
+            build_site(self.content, self.public, self.template, cache, force=True, async_io=True)
+            self.assertEqual((cache.hits, cache.misses), (2, 2))
+        self.assert_pages(serial)
+
+    def test_async_build_applies_backpressure(self):
+        self.add_pages(40)
+        pages = build.find_content(self.content, self.public)[0]
+        counts = {"read": 0, "written": 0, "most_ahead": 0}
+        lock = threading.Lock()
+        read_source = build._read_source
+        write_output = build._write_output
+
+        def counting_read(path):
+            with lock:
+                counts["read"] += 1
+                counts["most_ahead"] = max(counts["most_ahead"], counts["read"] - counts["written"])
+            return read_source(path)
+
+        def slow_write(path, html):
+            time.sleep(0.002)
+            write_output(path, html)
+            with lock:
+                counts["written"] += 1
+
+        with mock.patch.object(build, "_read_source", counting_read), mock.patch.object(build, "_write_output", slow_write):
+            asyncio.run(build_pages_async(pages, "{{ Content }}", queue_size=2, io_threads=2))
+        self.assertEqual(counts["written"], len(pages))
+        # Two queues, the page being rendered and the writes in flight
+        self.assertLessEqual(counts["most_ahead"], 2 + 2 + 1 + 2 + 1)
+
+    def test_shard_of_is_stable(self):
+        self.assertEqual(shard_of("blog/post.md", 4), shard_of(os.path.join("blog", "post.md"), 4))
+        self.assertEqual([shard_of(f"page{index}.md", 3) for index in range(6)], [0, 2, 0, 2, 0, 2])
+
+    def shard_dirs(self, count):
+        root = self.temporary_directory.name
+        return [os.path.join(root, f"shard-{index}") for index in range(count)]
+
+    def build_shards(self, count):
+        results = []
+        for index, shard_dir in enumerate(self.shard_dirs(count)):
+            results.append(build_site(self.content, shard_dir, self.template, shard=(index, count)))
+        return results
+
+    def test_shards_build_every_output_once(self):
+        self.add_pages(20)
+        results = self.build_shards(3)
+        relative = [
+            os.path.relpath(output, shard_dir)
+            for result, shard_dir in zip(results, self.shard_dirs(3))
+            for output in result["built"]
+        ]
+        self.assertEqual(len(relative), 23)
+        self.assertEqual(len(set(relative)), 23)
+        self.assertTrue(all(result["built"] for result in results))
+
+    def test_sharded_subprocess_build_matches_serial(self):
+        self.add_pages(20)
+        serial = self.take_serial_pages()
+        main = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+        workers = [
+            subprocess.Popen([
+                sys.executable, main, "--content", self.content, "--output", shard_dir,
+                "--template", self.template, "--shard", f"{index}/3",
+            ], stdout=subprocess.DEVNULL)
+            for index, shard_dir in enumerate(self.shard_dirs(3))
+        ]
+        self.assertEqual([worker.wait() for worker in workers], [0, 0, 0])
+        # CI hands the shards over as artifacts, unpacked somewhere else
+        moved = []
+        for shard_dir in self.shard_dirs(3):
+            moved.append(os.path.join(self.temporary_directory.name, "artifacts", os.path.basename(shard_dir)))
+            shutil.move(shard_dir, moved[-1])
+        shutil.rmtree(self.public)
+        result = merge_shards(moved, self.public)
+        self.assertEqual(len(result["built"]), 23)
+        self.assert_pages(serial)
+        self.assertEqual(self.read(os.path.join(self.public, "logo.png")), "image bytes")
+        # The merged manifest works for an ordinary incremental build
+        self.assertEqual(self.build()["built"], [])
+
+    def test_merge_copies_changes_and_removes_deleted_pages(self):
+        self.add_pages(5)
+        self.build_shards(2)
+        merge_shards(self.shard_dirs(2), self.public)
+        self.assertEqual(merge_shards(self.shard_dirs(2), self.public)["built"], [])
+
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nChanged")
+        self.bump_mtime(os.path.join(self.content, "index.md"))
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.build_shards(2)
+        result = merge_shards(self.shard_dirs(2), self.public)
+        self.assertEqual(result["built"], [os.path.join(self.public, "index.html")])
+        self.assertEqual(result["removed"], [os.path.join(self.public, "blog", "post.html")])
+        self.assertIn("Changed", self.read(os.path.join(self.public, "index.html")))
+
+    def test_merge_rejects_missing_shard(self):
+        self.build_shards(3)
+        with self.assertRaises(ValueError):
+            merge_shards(self.shard_dirs(3)[:2], self.public)
+
+    def test_compressed_build_writes_gzip_siblings(self):
+        self.add_pages(6)
+        serial = self.take_serial_pages()
+        for options in ({}, {"jobs": 3}, {"async_io": True}):
+            with self.subTest(**options):
+                result = build_site(self.content, self.public, self.template, force=True, compress=("gz",), **options)
+                self.assertEqual(sorted(result["built"]), sorted([*serial, os.path.join(self.public, "logo.png")]))
+                self.assert_pages(serial)
+                for path, html in serial.items():
+                    with open(path + ".gz", "rb") as file:
+                        self.assertEqual(gzip.decompress(file.read()), html)
+
+    def test_compressed_build_skips_unchanged_html(self):
+        self.build()
+        build_site(self.content, self.public, self.template, compress=("gz",))
+        index = os.path.join(self.public, "index.html")
+        stat = os.stat(index + ".gz")
+        # A trailing newline changes the source but not the HTML
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome\n\nTo the **site**\n")
+        self.bump_mtime(os.path.join(self.content, "index.md"))
+        result = build_site(self.content, self.public, self.template, compress=("gz",))
+        self.assertEqual((result["built"], result["skipped"]), ([], 3))
+        self.assertEqual(os.stat(index + ".gz").st_mtime_ns, stat.st_mtime_ns)
+
+        # Building without compression drops siblings that would go stale
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nChanged")
+        self.bump_mtime(os.path.join(self.content, "index.md"))
+        self.assertEqual(self.build()["built"], [index])
+        self.assertFalse(os.path.exists(index + ".gz"))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "blog", "post.html.gz")))
+
+    def test_deleted_source_removes_compressed_siblings(self):
+        build_site(self.content, self.public, self.template, compress=("gz",))
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        build_site(self.content, self.public, self.template, compress=("gz",))
+        self.assertEqual(os.listdir(os.path.join(self.public, "blog")), [])
+
+    def test_merge_copies_compressed_siblings(self):
+        for index, shard_dir in enumerate(self.shard_dirs(2)):
+            build_site(self.content, shard_dir, self.template, shard=(index, 2), compress=("gz",))
+        merge_shards(self.shard_dirs(2), self.public)
+        self.assertTrue(os.path.exists(os.path.join(self.public, "blog", "post.html.gz")))
+        result = build_site(self.content, self.public, self.template, compress=("gz",))
+        self.assertEqual(result["built"], [])
+
+    def test_async_build_raises_failed_write(self):
+        self.add_pages(10)
+        pages = build.find_content(self.content, self.public)[0]
+        # A directory where a page should go makes its write fail
+        os.makedirs(pages[3][1])
+        with self.assertRaises(ExceptionGroup) as caught:
+            asyncio.run(build_pages_async(pages, "{{ Content }}", io_threads=2))
+        self.assertIsNotNone(caught.exception.subgroup(IsADirectoryError))
+
+    def test_worker_memo_counts_reach_parent(self):
+        self.add_pages(12)
+        lookups = {}
+        for name, options in (("serial", {}), ("parallel", {"jobs": 2}), ("async", {"jobs": 2, "async_io": True})):
+            memo = MemoCache(render_inline, max_entries=64)
+            previous = set_inline_memo(memo)
+            try:
+                build_site(self.content, self.public, self.template, force=True, **options)
+            finally:
+                set_inline_memo(previous)
+            lookups[name] = memo.hits + memo.misses
+        # Each worker has its own memo, so hits differ but lookups don't
+        self.assertGreater(lookups["serial"], 0)
+        self.assertEqual(lookups["parallel"], lookups["serial"])
+        self.assertEqual(lookups["async"], lookups["serial"])
+
+    def test_init_worker_builds_memo_from_settings(self):
+        # A spawned worker only has what _init_worker is given
+        previous = set_inline_memo(None)
+        try:
+            build._init_worker(None, (render_inline, 8, None))
+            memo = build.get_inline_memo()
+            self.assertIsInstance(memo, MemoCache)
+            self.assertEqual((memo.render_source, memo.max_entries), (render_inline, 8))
+        finally:
+            set_inline_memo(previous)
+
+    def test_cached_render_matches_streamed(self):
+        with tempfile.TemporaryDirectory() as cache_directory:
+            self.build()
+            streamed = self.read(os.path.join(self.public, "blog", "post.html"))
+            cache = RenderCache(cache_directory, render_content)
+            build_site(self.content, self.public, self.template, cache, force=True)
+            self.assertEqual(self.read(os.path.join(self.public, "blog", "post.html")), streamed)
+            self.assertEqual(cache.stats()["misses"], 2)
+
+    def test_line_separators_render_the_same_in_every_mode(self):
+        # str.splitlines() also breaks at these, a file's lines don't
+        self.write(
+            os.path.join(self.content, "odd.md"),
+            "# Odd\n\npara one\x0cstill para\n\nnext\u2028line\x1cand\x85more",
+        )
+        serial = self.take_serial_pages()
+        self.assertIn("para one\x0cstill para", serial[os.path.join(self.public, "odd.html")].decode())
+        with tempfile.TemporaryDirectory() as cache_directory:
+            cache = RenderCache(cache_directory, render_content)
+            for options in (
+                {"jobs": 2},
+                {"async_io": True},
+                {"async_io": True, "jobs": 2},
+                {"render_cache": cache},
+                {"render_cache": cache, "async_io": True},
+                {"compress": ("gz",)},
+            ):
+                with self.subTest(**options):
+                    build_site(self.content, self.public, self.template, force=True, **options)
+                    self.assert_pages(serial)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import gzip
+import os
+import tempfile
+import shutil
+import unittest
+from unittest import mock
+
+from compressed import CompressedWriter, remove_siblings, write_compressed
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class TestCompressedWriter(unittest.TestCase):
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temporary_directory.name, "blog", "post.html")
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+
+    def read(self, path):
+        with open(path, "rb") as file:
+            return file.read()
+
+    def test_writes_plain_and_gzip_in_one_pass(self):
+        with CompressedWriter(self.path, ("gz",)) as out:
+            for fragment in ("<div>", "café " * 1000, "</div>"):
+                out.write(fragment)
+        expected = ("<div>" + "café " * 1000 + "</div>").encode("utf-8")
+        self.assertTrue(out.written)
+        self.assertEqual(self.read(self.path), expected)
+        self.assertEqual(gzip.decompress(self.read(self.path + ".gz")), expected)
+        self.assertEqual(sorted(os.listdir(os.path.dirname(self.path))), ["post.html", "post.html.gz"])
+
+    def test_same_content_compresses_the_same(self):
+        write_compressed(self.path, "<p>hello</p>", ("gz",))
+        first = self.read(self.path + ".gz")
+        os.remove(self.path + ".gz")
+        write_compressed(self.path, "<p>hello</p>", ("gz",))
+        self.assertEqual(self.read(self.path + ".gz"), first)
+
+    def test_unchanged_content_is_skipped(self):
+        digest, written = write_compressed(self.path, "<p>hello</p>", ("gz",))
+        self.assertTrue(written)
+        os.utime(self.path, ns=(0, 0))
+        self.assertEqual(write_compressed(self.path, "<p>hello</p>", ("gz",), digest), (digest, False))
+        self.assertEqual(os.stat(self.path).st_mtime_ns, 0)
+        self.assertTrue(write_compressed(self.path, "<p>bye</p>", ("gz",), digest)[1])
+        self.assertEqual(self.read(self.path), b"<p>bye</p>")
+
+    def test_missing_sibling_is_rewritten(self):
+        digest, _ = write_compressed(self.path, "<p>hello</p>", ("gz",))
+        os.remove(self.path + ".gz")
+        self.assertTrue(write_compressed(self.path, "<p>hello</p>", ("gz",), digest)[1])
+        self.assertTrue(os.path.exists(self.path + ".gz"))
+
+    def test_failed_render_leaves_no_files(self):
+        with self.assertRaises(RuntimeError):
+            with CompressedWriter(self.path, ("gz",)) as out:
+                out.write("<p>")
+                raise RuntimeError("render failed")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), [])
+
+    def test_failed_render_keeps_previous_files(self):
+        digest, _ = write_compressed(self.path, "<p>hello</p>", ("gz",))
+        for previous_hash in (None, digest):
+            with self.subTest(previous_hash=previous_hash):
+                with self.assertRaises(RuntimeError):
+                    with CompressedWriter(self.path, ("gz",), previous_hash) as out:
+                        out.write("<p>bye</p>")
+                        raise RuntimeError("render failed")
+                self.assertEqual(self.read(self.path), b"<p>hello</p>")
+                self.assertEqual(gzip.decompress(self.read(self.path + ".gz")), b"<p>hello</p>")
+                self.assertEqual(sorted(os.listdir(os.path.dirname(self.path))), ["post.html", "post.html.gz"])
+
+    def test_failed_rewrite_keeps_previous_files(self):
+        digest, _ = write_compressed(self.path, "<p>hello</p>", ("gz",))
+        copy = shutil.copyfileobj
+        calls = []
+
+        def fail_second_copy(source, destination):
+            # The plain file's copy is complete when its sibling's fails
+            calls.append(destination.name)
+            if len(calls) == 2:
+                raise OSError("disk full")
+            copy(source, destination)
+
+        with mock.patch("compressed.shutil.copyfileobj", fail_second_copy):
+            with self.assertRaises(OSError):
+                write_compressed(self.path, "<p>bye</p>", ("gz",), digest)
+        self.assertEqual(calls, [self.path + ".tmp", self.path + ".gz.tmp"])
+        self.assertEqual(self.read(self.path), b"<p>hello</p>")
+        self.assertEqual(gzip.decompress(self.read(self.path + ".gz")), b"<p>hello</p>")
+        self.assertEqual(sorted(os.listdir(os.path.dirname(self.path))), ["post.html", "post.html.gz"])
+
+    @unittest.skipUnless(brotli, "brotli is not installed")
+    def test_writes_brotli(self):
+        html = "<div>" + "café " * 1000 + "</div>"
+        for previous_hash in (None, "0" * 64):
+            with self.subTest(previous_hash=previous_hash):
+                self.assertTrue(write_compressed(self.path, html, ("gz", "br"), previous_hash)[1])
+                self.assertEqual(brotli.decompress(self.read(self.path + ".br")), html.encode("utf-8"))
+                self.assertEqual(
+                    sorted(os.listdir(os.path.dirname(self.path))),
+                    ["post.html", "post.html.br", "post.html.gz"],
+                )
+
+    def test_unsupported_format(self):
+        with self.assertRaises(ValueError):
+            CompressedWriter(self.path, ("zip",))
+
+    def test_remove_siblings(self):
+        write_compressed(self.path, "<p>hello</p>", ("gz",))
+        remove_siblings(self.path, keep=("gz",))
+        self.assertTrue(os.path.exists(self.path + ".gz"))
+        remove_siblings(self.path)
+        self.assertFalse(os.path.exists(self.path + ".gz"))
+        self.assertTrue(os.path.exists(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,11 @@
+import copy
+import io
+import pickle
+import random
 import unittest
 
-from htmlnode import HTMLNode, LeafNode, ParentNode, text_node_to_html_node, split_nodes_delimiter,extract_markdown_images, extract_markdown_links, split_nodes_image, split_nodes_link
-from textnode import TextNode, TextType
+from htmlnode import HTMLNode, HTMLProps, LeafNode, ParentNode, text_node_to_html_node, split_nodes_delimiter,extract_markdown_images, extract_markdown_links, iter_markdown_images, iter_markdown_links, split_nodes_image, split_nodes_link, text_to_textnodes, text_nodes_to_html_nodes, render_html, set_stage_hook, text_to_children, BracketTable, chained_text_to_textnodes
+from textnode import TextNode, TextType, intern_text_node
 
 class TestHTMLNode(unittest.TestCase):
     
@@ -17,6 +21,32 @@ class TestHTMLNode(unittest.TestCase):
             ' class="greeting" href="https://boot.dev"',
         )
 
+    def test_props_are_escaped(self):
+        node = HTMLNode("a", "link", None, {"href": "/search?q=a&b", "title": 'say "hi" <now>'})
+        self.assertEqual(
+            node.props_to_html(),
+            ' href="/search?q=a&amp;b" title="say &quot;hi&quot; &lt;now&gt;"',
+        )
+
+    def test_props_cache_invalidated_on_change(self):
+        node = LeafNode("a", "link", {"href": "/one"})
+        self.assertEqual(node.to_html(), '<a href="/one">link</a>')
+        node.props["href"] = "/two"
+        self.assertEqual(node.to_html(), '<a href="/two">link</a>')
+        node.props.update(rel="next")
+        self.assertEqual(node.to_html(), '<a href="/two" rel="next">link</a>')
+        del node.props["rel"]
+        self.assertEqual(node.to_html(), '<a href="/two">link</a>')
+        node.props = {"href": "/three"}
+        self.assertEqual(node.to_html(), '<a href="/three">link</a>')
+        node.props = None
+        self.assertEqual(node.to_html(), "<a>link</a>")
+
+    def test_props_behave_like_dict(self):
+        node = HTMLNode("div", None, None, {"class": "primary"})
+        self.assertEqual(node.props, {"class": "primary"})
+        self.assertIsInstance(node.props, HTMLProps)
+
     def test_values(self):
         node = HTMLNode(
             "div",
@@ -51,6 +81,14 @@ class TestHTMLNode(unittest.TestCase):
             "HTMLNode(p, What a strange world, children: None, {'class': 'primary'})",
         )
 
+    def test_no_instance_dict(self):
+        for node in (
+            HTMLNode("div", "value"),
+            LeafNode("p", "Hello, world!"),
+            ParentNode("div", []),
+        ):
+            self.assertFalse(hasattr(node, "__dict__"))
+
     def test_leaf_to_html_p(self):
         node = LeafNode("p", "Hello, world!")
         self.assertEqual(node.to_html(), "<p>Hello, world!</p>")
@@ -125,6 +163,139 @@ class TestHTMLNode(unittest.TestCase):
             parent.to_html()
         self.assertTrue("invalid HTML: no children" in str(context.exception))
 
+    def test_iter_html_fragments(self):
+        parent_node = ParentNode(
+            "div",
+            [ParentNode("p", [LeafNode("b", "bold"), LeafNode(None, " text")])],
+            {"class": "container"},
+        )
+        self.assertListEqual(
+            list(parent_node.iter_html()),
+            ['<div class="container">', "<p>", "<b>bold</b>", " text", "</p>", "</div>"],
+        )
+
+    def test_write_html(self):
+        parent_node = ParentNode("div", [LeafNode("span", "child"), LeafNode(None, "tail")])
+        stream = io.StringIO()
+        parent_node.write_html(stream)
+        self.assertEqual(stream.getvalue(), parent_node.to_html())
+        self.assertEqual(stream.getvalue(), "<div><span>child</span>tail</div>")
+
+    def test_write_html_needs_only_write(self):
+        class WriteOnly():
+            def __init__(self):
+                self.fragments = []
+
+            def write(self, text):
+                self.fragments.append(text)
+
+        parent_node = ParentNode("div", [LeafNode("span", "child"), LeafNode(None, "tail")])
+        stream = WriteOnly()
+        parent_node.write_html(stream)
+        self.assertEqual("".join(stream.fragments), parent_node.to_html())
+
+    def test_base_node_not_renderable(self):
+        with self.assertRaises(NotImplementedError):
+            HTMLNode("div", "value").to_html()
+
+    def test_nesting_beyond_recursion_limit(self):
+        depth = 10000
+        node = LeafNode("b", "deep")
+        for _ in range(depth):
+            node = ParentNode("div", [node])
+        self.assertEqual(
+            node.to_html(),
+            "<div>" * depth + "<b>deep</b>" + "</div>" * depth,
+        )
+
+    def test_siblings_after_nested_child(self):
+        root = ParentNode("div", [
+            ParentNode("ul", [ParentNode("li", [LeafNode(None, "one")])]),
+            LeafNode("p", "after"),
+            ParentNode("span", []),
+        ])
+        self.assertEqual(
+            root.to_html(),
+            "<div><ul><li>one</li></ul><p>after</p><span></span></div>",
+        )
+
+    def header(self):
+        return ParentNode("header", [
+            ParentNode("nav", [
+                LeafNode("a", "Home", {"href": "/"}),
+                LeafNode("a", "Blog", {"href": "/blog"}),
+            ], {"class": "nav"}),
+        ])
+
+    def test_frozen_renders_same_html(self):
+        expected = self.header().to_html()
+        header = self.header().freeze()
+        self.assertTrue(header.frozen)
+        self.assertTrue(header.children[0].children[1].frozen)
+        self.assertEqual(header.to_html(), expected)
+        self.assertEqual(header.to_html(), expected)
+
+    def test_frozen_subtree_inside_page(self):
+        header = self.header().freeze()
+        pages = [
+            ParentNode("body", [header, LeafNode("p", f"page {index}")])
+            for index in range(3)
+        ]
+        for index, page in enumerate(pages):
+            self.assertEqual(
+                page.to_html(),
+                f"<body>{self.header().to_html()}<p>page {index}</p></body>",
+            )
+        self.assertFalse(pages[0].frozen)
+
+    def test_frozen_reuses_rendered_html(self):
+        header = self.header().freeze()
+        self.assertIs(header.to_html(), header.to_html())
+
+    def test_freeze_deep_tree(self):
+        depth = 10000
+        node = LeafNode("b", "deep")
+        for _ in range(depth):
+            node = ParentNode("div", [node])
+        node.freeze()
+        self.assertEqual(
+            ParentNode("body", [node]).to_html(),
+            "<body>" + "<div>" * depth + "<b>deep</b>" + "</div>" * depth + "</body>",
+        )
+
+    def test_frozen_node_rejects_mutation(self):
+        header = self.header().freeze()
+        with self.assertRaises(AttributeError):
+            header.tag = "footer"
+        with self.assertRaises(AttributeError):
+            header.children[0].props = {"class": "other"}
+        with self.assertRaises(TypeError):
+            header.children[0].props["class"] = "other"
+        with self.assertRaises(AttributeError):
+            header.children.append(LeafNode("p", "more"))
+        leaf = LeafNode("b", "bold").freeze()
+        with self.assertRaises(AttributeError):
+            leaf.value = "changed"
+        self.assertEqual(leaf.to_html(), "<b>bold</b>")
+
+    def test_frozen_node_copies_and_pickles(self):
+        header = self.header().freeze()
+        expected = header.to_html()
+        for clone in (pickle.loads(pickle.dumps(header)), copy.copy(header), copy.deepcopy(header)):
+            self.assertTrue(clone.frozen)
+            self.assertTrue(clone.children[0].children[1].frozen)
+            self.assertEqual(clone.to_html(), expected)
+            with self.assertRaises(TypeError):
+                clone.children[0].props["class"] = "other"
+        leaf = pickle.loads(pickle.dumps(LeafNode("b", "bold").freeze()))
+        self.assertEqual((leaf.frozen, leaf.to_html()), (True, "<b>bold</b>"))
+
+    def test_freeze_leaves_original_props_editable(self):
+        props = {"href": "/"}
+        LeafNode("a", "Home", props).freeze()
+        props["href"] = "/changed"
+        self.assertEqual(props, {"href": "/changed"})
+
     def test_text(self):
         node = TextNode("This is a text node", TextType.TEXT)
         html_node = text_node_to_html_node(node)
@@ -164,6 +335,28 @@ class TestHTMLNode(unittest.TestCase):
         self.assertEqual(html_node.props["src"], "image.png")
         self.assertEqual(html_node.props["alt"], "Alt text")
     
+    def test_invalid_text_type(self):
+        node = TextNode("Mystery", "underline")
+        with self.assertRaises(ValueError):
+            text_node_to_html_node(node)
+
+    def test_batch_conversion(self):
+        nodes = [
+            TextNode("plain ", TextType.TEXT),
+            TextNode("strong", TextType.BOLD),
+            TextNode("site", TextType.LINK, "https://boot.dev"),
+            TextNode("alt", TextType.IMAGE, "image.png"),
+        ]
+        html_nodes = text_nodes_to_html_nodes(nodes)
+        self.assertListEqual(
+            [node.to_html() for node in html_nodes],
+            [text_node_to_html_node(node).to_html() for node in nodes],
+        )
+        self.assertEqual(
+            "".join(node.to_html() for node in html_nodes),
+            'plain <b>strong</b><a href="https://boot.dev">site</a><img src="image.png" alt="alt"></img>',
+        )
+
     def test_split(self):
         node = TextNode("This is text with a `code block` word", TextType.TEXT)
         
@@ -256,6 +449,27 @@ class TestSplitNodesDelimiter(unittest.TestCase):
 
 
 
+    def test_adjacent_and_leading_delimiters(self):
+        node = TextNode("**a****b** tail", TextType.TEXT)
+        new_nodes = split_nodes_delimiter([node], "**", TextType.BOLD)
+        self.assertListEqual(
+            [
+                TextNode("a", TextType.BOLD),
+                TextNode("b", TextType.BOLD),
+                TextNode(" tail", TextType.TEXT),
+            ],
+            new_nodes,
+        )
+
+    def test_many_spans(self):
+        node = TextNode("`x` " * 1000, TextType.TEXT)
+        new_nodes = split_nodes_delimiter([node], "`", TextType.CODE)
+        self.assertEqual(len(new_nodes), 2000)
+        self.assertEqual(new_nodes[-2], TextNode("x", TextType.CODE))
+        self.assertEqual(new_nodes[-1], TextNode(" ", TextType.TEXT))
+
+
+
 class TestMarkdownExtraction(unittest.TestCase):
     def test_extract_markdown_images_single(self):
         text = "This is text with an ![image](https://i.imgur.com/zjjcJKZ.png)"
@@ -306,6 +520,140 @@ class TestMarkdownExtraction(unittest.TestCase):
         self.assertListEqual([], matches)
 
 
+    def test_iter_markdown_images_spans(self):
+        text = "a ![one](u1) b ![two](u2)"
+        self.assertListEqual(
+            [(2, 12, "one", "u1"), (15, 25, "two", "u2")],
+            list(iter_markdown_images(text)),
+        )
+
+    def test_iter_markdown_links_spans(self):
+        text = "![img](u) and [link](u)"
+        self.assertListEqual(
+            [(14, 23, "link", "u")],
+            list(iter_markdown_links(text)),
+        )
+
+
+
+
+def naive_pair(text, index, opener, closer):
+    # Finds the closer for the opener at index by counting depth
+    depth = 0
+    for position in range(index, len(text)):
+        if text[position] == opener:
+            depth += 1
+        elif text[position] == closer:
+            depth -= 1
+            if depth == 0:
+                return position
+    return None
+
+
+def naive_construct(text, index):
+    close = naive_pair(text, index, "[", "]")
+    if close is None or text[close + 1:close + 2] != "(":
+        return None
+    url_close = naive_pair(text, close + 1, "(", ")")
+    return None if url_close is None else (close, url_close)
+
+
+def naive_extract(text, images):
+    # Quadratic reference for the links and images BracketTable finds
+    valid_images = [
+        index for index in range(1, len(text))
+        if text[index] == "[" and text[index - 1] == "!" and naive_construct(text, index)
+    ]
+    found = []
+    position = 0
+    for index in range(len(text)):
+        if text[index] != "[" or index < position:
+            continue
+        construct = naive_construct(text, index)
+        if construct is None:
+            continue
+        close, url_close = construct
+        if images:
+            if index not in valid_images or index - 1 < position:
+                continue
+        elif text[index - 1:index] == "!" or any(index < image < url_close for image in valid_images):
+            continue
+        found.append((text[index + 1:close], text[close + 2:url_close]))
+        position = url_close + 1
+    return found
+
+
+class TestBracketTable(unittest.TestCase):
+    def test_nested_brackets_in_link_text(self):
+        self.assertListEqual(
+            [("a[0] and [b]", "/arrays")],
+            extract_markdown_links("see [a[0] and [b]](/arrays) here"),
+        )
+
+    def test_balanced_parentheses_in_url(self):
+        self.assertListEqual(
+            [("Foo", "https://en.wikipedia.org/wiki/Foo_(bar)")],
+            extract_markdown_links("[Foo](https://en.wikipedia.org/wiki/Foo_(bar)) (aside)"),
+        )
+        self.assertListEqual(
+            [("img", "/a_(1).png")],
+            extract_markdown_images("![img](/a_(1).png)"),
+        )
+
+    def test_unclosed_brackets_are_text(self):
+        self.assertListEqual([("b", "c")], extract_markdown_links("[[[a [b](c) [d]("))
+        self.assertListEqual([], extract_markdown_links("[a](b"))
+
+    def test_image_inside_link_wins(self):
+        text = "[![badge](/badge.svg)](https://ci.example.com)"
+        self.assertListEqual([], extract_markdown_links(text))
+        self.assertListEqual([("badge", "/badge.svg")], extract_markdown_images(text))
+        self.assertListEqual(
+            [
+                TextNode("[", TextType.TEXT),
+                TextNode("badge", TextType.IMAGE, "/badge.svg"),
+                TextNode("](https://ci.example.com)", TextType.TEXT),
+            ],
+            text_to_textnodes(text),
+        )
+
+    def test_offsets(self):
+        table = BracketTable("x ![a](b) [c](d)")
+        self.assertListEqual([(2, 9, 4, 5, 7, 8)], list(table.iter_images()))
+        self.assertListEqual([(10, 16, 11, 12, 14, 15)], list(table.iter_links()))
+
+    def test_fuzz_against_naive_matcher(self):
+        generator = random.Random(23)
+        for _ in range(3000):
+            text = "".join(generator.choice("[]()!ab") for _ in range(generator.randrange(1, 30)))
+            with self.subTest(text=text):
+                self.assertListEqual(naive_extract(text, True), extract_markdown_images(text))
+                self.assertListEqual(naive_extract(text, False), extract_markdown_links(text))
+                chained = split_nodes_link(split_nodes_image([TextNode(text, TextType.TEXT)]))
+                self.assertListEqual(
+                    [node for node in chained if node.text or node.text_type != TextType.TEXT],
+                    text_to_textnodes(text),
+                )
+
+    def test_pathological_input(self):
+        # Each of these is quadratic for a matcher that rescans from every [;
+        # the "brackets" benchmark group times them, this checks the results
+        size = 20_000
+        texts = [
+            "[" * size,
+            "![" * (size // 2),
+            "[a](" * (size // 4),
+            "[" * (size // 2) + "]" * (size // 2),
+            "[a]" * (size // 3) + "(",
+        ]
+        for text in texts:
+            with self.subTest(text=text[:8]):
+                self.assertEqual(extract_markdown_links(text), [])
+                self.assertEqual(extract_markdown_images(text), [])
+                self.assertEqual(text_to_textnodes(text), [TextNode(text, TextType.TEXT)])
+        nested = "[a [b](/c) d](/e) ![x [y](/z)](/w) "
+        self.assertEqual(extract_markdown_links(nested * 1000), extract_markdown_links(nested) * 1000)
+        self.assertEqual(extract_markdown_images(nested * 1000), extract_markdown_images(nested) * 1000)
 
 
 class TestSplitNodesImage(unittest.TestCase):
@@ -472,6 +820,28 @@ class TestSplitNodesLink(unittest.TestCase):
             new_nodes,
         )
 
+    def test_split_links_repeated(self):
+        node = TextNode("[same](url) and [same](url)", TextType.TEXT)
+        self.assertListEqual(
+            [
+                TextNode("same", TextType.LINK, "url"),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("same", TextType.LINK, "url"),
+            ],
+            split_nodes_link([node]),
+        )
+
+    def test_split_links_after_matching_image(self):
+        # The link text also appears inside the image before it
+        node = TextNode("![same](url) then [same](url)", TextType.TEXT)
+        self.assertListEqual(
+            [
+                TextNode("![same](url) then ", TextType.TEXT),
+                TextNode("same", TextType.LINK, "url"),
+            ],
+            split_nodes_link([node]),
+        )
+
     def test_split_links_non_text_node(self):
         node = TextNode(
             "This is bold text with a [link](url)",
@@ -483,5 +853,131 @@ class TestSplitNodesLink(unittest.TestCase):
   
 
         
+class TestTextToTextNodes(unittest.TestCase):
+    def chained(self, text):
+        # The split_nodes_* chain that text_to_textnodes replaces, less its
+        # empty text nodes
+        return [
+            node for node in chained_text_to_textnodes(text)
+            if node.text or node.text_type != TextType.TEXT
+        ]
+
+    def test_all_types(self):
+        text = (
+            "This is **text** with an _italic_ word and a `code block` and an"
+            " ![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a"
+            " [link](https://boot.dev)"
+        )
+        self.assertListEqual(
+            [
+                TextNode("This is ", TextType.TEXT),
+                TextNode("text", TextType.BOLD),
+                TextNode(" with an ", TextType.TEXT),
+                TextNode("italic", TextType.ITALIC),
+                TextNode(" word and a ", TextType.TEXT),
+                TextNode("code block", TextType.CODE),
+                TextNode(" and an ", TextType.TEXT),
+                TextNode("obi wan image", TextType.IMAGE, "https://i.imgur.com/fJRm4Vk.jpeg"),
+                TextNode(" and a ", TextType.TEXT),
+                TextNode("link", TextType.LINK, "https://boot.dev"),
+            ],
+            text_to_textnodes(text),
+        )
+
+    def test_matches_chain(self):
+        texts = [
+            "Plain text without any markdown",
+            "**bold** at the start and `code` at the end `x`",
+            "![image1](url1)![image2](url2)[link1](url1)[link2](url2)",
+            "Repeated [link](url) and [link](url) and ![img](src) ![img](src)",
+            "Unmatched [bracket and ![bang with `code` inside",
+            "A `code` span then **bold** then _italic_ then [a](b)",
+            "",
+        ]
+        for text in texts:
+            with self.subTest(text=text):
+                self.assertListEqual(self.chained(text), text_to_textnodes(text))
+
+    def test_code_is_opaque(self):
+        self.assertListEqual(
+            [
+                TextNode("call ", TextType.TEXT),
+                TextNode("snake_case_name", TextType.CODE),
+            ],
+            text_to_textnodes("call `snake_case_name`"),
+        )
+
+    def test_missing_closing_delimiter(self):
+        with self.assertRaises(ValueError):
+            text_to_textnodes("Text with **bold but no closing")
+
+
+class TestTextToChildren(unittest.TestCase):
+    def test_matches_two_step_conversion(self):
+        texts = [
+            "Plain text without any markdown",
+            "This is **text** with an _italic_ word and a `code block`",
+            "An ![image](https://example.com/a.png) and a [link](https://boot.dev?a=1&b=\"2\")",
+            "Unmatched [bracket and ![bang",
+            "",
+        ]
+        for text in texts:
+            with self.subTest(text=text):
+                self.assertEqual(
+                    [node.to_html() for node in text_to_children(text)],
+                    [node.to_html() for node in text_nodes_to_html_nodes(text_to_textnodes(text))],
+                )
+
+    def test_builds_leaves(self):
+        children = text_to_children("a [b](c)")
+        self.assertTrue(all(isinstance(child, LeafNode) for child in children))
+        self.assertEqual(children[1].props, {"href": "c"})
+
+    def test_missing_closing_delimiter(self):
+        with self.assertRaises(ValueError):
+            text_to_children("`unclosed")
+
+
+class TestFrozenTextNodeConversion(unittest.TestCase):
+    def test_leaf_is_shared_and_frozen(self):
+        node = intern_text_node("home", TextType.LINK, "/")
+        leaf = text_node_to_html_node(node)
+        self.assertTrue(leaf.frozen)
+        self.assertIs(text_node_to_html_node(node), leaf)
+        self.assertIs(text_nodes_to_html_nodes([node, TextNode("x", TextType.TEXT)])[0], leaf)
+        self.assertEqual(leaf.to_html(), '<a href="/">home</a>')
+
+    def test_matches_mutable_conversion(self):
+        for text_type in TextType:
+            with self.subTest(text_type=text_type):
+                node = TextNode("text", text_type, "/url")
+                self.assertEqual(
+                    text_node_to_html_node(node.freeze()).to_html(),
+                    text_node_to_html_node(node).to_html(),
+                )
+
+
+class TestStageHook(unittest.TestCase):
+    def test_hook_sees_each_stage(self):
+        calls = []
+        previous = set_stage_hook(lambda *call: calls.append(call))
+        try:
+            nodes = text_to_textnodes("a **b** c")
+            html = render_html(ParentNode("p", text_nodes_to_html_nodes(nodes)))
+            text_to_children("a **b** c")
+        finally:
+            set_stage_hook(previous)
+        self.assertEqual([call[0] for call in calls], ["tokenize", "convert", "render", "inline"])
+        self.assertEqual(calls[0][2:], (3, 0))
+        self.assertEqual(calls[1][2:], (3, 0))
+        self.assertEqual(calls[2][2:], (0, len(html)))
+        self.assertEqual(calls[3][2:], (3, 0))
+        self.assertTrue(all(call[1] >= 0 for call in calls))
+
+    def test_no_hook_by_default(self):
+        self.assertIsNone(set_stage_hook(None))
+        self.assertEqual(render_html(LeafNode("b", "é")), "<b>é</b>")
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,84 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from main import main
+
+
+class TestMain(unittest.TestCase):
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        root = self.temporary_directory.name
+        self.content = os.path.join(root, "content")
+        self.public = os.path.join(root, "public")
+        for index in range(3):
+            self.write(os.path.join(self.content, f"page{index}.md"), f"# Page {index}\n\nText {index}")
+        self.previous_directory = os.getcwd()
+        # No template.html here, so the default falls back to the built-in one
+        os.chdir(root)
+
+    def tearDown(self):
+        os.chdir(self.previous_directory)
+        self.temporary_directory.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+
+    def run_main(self, *argv):
+        with contextlib.redirect_stdout(io.StringIO()):
+            main(["--content", self.content, "--output", self.public, *argv])
+
+    def test_missing_default_template_uses_built_in(self):
+        self.run_main()
+        with open(os.path.join(self.public, "page0.html"), encoding="utf-8") as file:
+            self.assertIn("<title>Page 0</title>", file.read())
+
+    def test_missing_explicit_template_is_an_error(self):
+        with self.assertRaises(SystemExit), contextlib.redirect_stderr(io.StringIO()) as stderr:
+            self.run_main("--template", "missing.html")
+        self.assertIn("missing.html does not exist", stderr.getvalue())
+        self.assertFalse(os.path.exists(self.public))
+
+    def test_missing_content_is_an_error(self):
+        self.run_main()
+        with self.assertRaises(SystemExit), contextlib.redirect_stderr(io.StringIO()) as stderr:
+            main(["--content", "contnet", "--output", self.public])
+        self.assertIn("contnet is not a directory", stderr.getvalue())
+        self.assertEqual(len(os.listdir(self.public)), 4)
+
+    def test_inline_memo_limits(self):
+        with contextlib.redirect_stdout(io.StringIO()) as stdout:
+            main([
+                "--content", self.content, "--output", self.public,
+                "--inline-memo", "10", "--inline-memo-max-bytes", "20",
+            ])
+        self.assertRegex(stdout.getvalue(), r"Inline memo: .*'bytes': ([0-9]|1[0-9]|20),")
+        with self.assertRaises(SystemExit), contextlib.redirect_stderr(io.StringIO()) as stderr:
+            self.run_main("--inline-memo-max-bytes", "20")
+        self.assertIn("needs --inline-memo", stderr.getvalue())
+
+    def test_profile_rejects_async_io(self):
+        with self.assertRaises(SystemExit), contextlib.redirect_stderr(io.StringIO()) as stderr:
+            self.run_main("--profile", "--async-io")
+        self.assertIn("--profile can't be combined with --async-io", stderr.getvalue())
+        self.assertFalse(os.path.exists(self.public))
+
+    def test_cache_limits(self):
+        for jobs in ("1", "3"):
+            with self.subTest(jobs=jobs):
+                cache = os.path.join(self.temporary_directory.name, f"cache{jobs}")
+                with contextlib.redirect_stdout(io.StringIO()) as stdout:
+                    main([
+                        "--content", self.content, "--output", self.public, "--force",
+                        "--cache", cache, "--cache-max-entries", "2", "--jobs", jobs,
+                    ])
+                self.assertEqual(len(os.listdir(cache)), 2)
+                self.assertIn("'entries': 2,", stdout.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import tempfile
+import unittest
+
+from build import build_site
+from htmlnode import set_stage_hook, text_to_textnodes
+from profiling import BuildProfile
+
+
+class TestBuildProfile(unittest.TestCase):
+    def test_records_stages_per_page(self):
+        profile = BuildProfile()
+        with profile:
+            with profile.page("a.md"):
+                text_to_textnodes("one **two**")
+            text_to_textnodes("outside any page")
+        self.assertIsNone(set_stage_hook(None))
+        self.assertEqual(profile.stages["tokenize"]["calls"], 2)
+        self.assertEqual(profile.stages["tokenize"]["nodes"], 3)
+        self.assertEqual(profile.pages["a.md"]["stages"]["tokenize"]["calls"], 1)
+        self.assertGreaterEqual(profile.pages["a.md"]["seconds"], 0)
+
+    def test_build_site_profile(self):
+        with tempfile.TemporaryDirectory() as root:
+            content = os.path.join(root, "content")
+            os.makedirs(content)
+            for name, text in (("short.md", "# Short"), ("long.md", "# Long\n\n" + "Some **bold** text.\n\n" * 200)):
+                with open(os.path.join(content, name), "w", encoding="utf-8") as file:
+                    file.write(text)
+            with BuildProfile() as profile:
+                build_site(content, os.path.join(root, "public"), jobs=4, profile=profile)
+
+        self.assertEqual(set(profile.pages), {os.path.join(content, "short.md"), os.path.join(content, "long.md")})
+        self.assertEqual(set(profile.stages), {"inline", "render"})
+        self.assertGreater(profile.stages["render"]["bytes"], 200 * len("<p>Some <b>bold</b> text.</p>"))
+        slowest, _ = profile.slowest_pages(1)[0]
+        self.assertEqual(slowest, os.path.join(content, "long.md"))
+        report = profile.report(1)
+        self.assertIn("Slowest 1 of 2 pages:", report)
+        self.assertIn("long.md", report)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import os
+import tempfile
+import unittest
+
+from htmlnode import text_nodes_to_html_nodes, text_to_textnodes
+from rendercache import MemoCache, RenderCache
+
+
+def render_inline(text):
+    return "".join(node.to_html() for node in text_nodes_to_html_nodes(text_to_textnodes(text)))
+
+
+class TestRenderCache(unittest.TestCase):
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.directory = self.temporary_directory.name
+        self.renders = []
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+
+    def render(self, text):
+        self.renders.append(text)
+        return render_inline(text)
+
+    def test_miss_then_hit(self):
+        cache = RenderCache(self.directory, self.render)
+        self.assertEqual(cache.render("some **bold** text"), "some <b>bold</b> text")
+        self.assertEqual(cache.render("some **bold** text"), "some <b>bold</b> text")
+        self.assertListEqual(["some **bold** text"], self.renders)
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+        self.assertEqual(cache.stats()["hit_rate"], 0.5)
+
+    def test_persists_between_instances(self):
+        RenderCache(self.directory, self.render).render("a [link](url)")
+        cache = RenderCache(self.directory, self.render)
+        self.assertEqual(cache.render("a [link](url)"), 'a <a href="url">link</a>')
+        self.assertEqual(len(self.renders), 1)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_reload_sees_other_instances(self):
+        cache = RenderCache(self.directory, self.render, max_entries=2)
+        other = RenderCache(self.directory, self.render, max_entries=2)
+        cache.render("one")
+        other.render("two")
+        other.render("three")
+        self.assertEqual(cache.stats()["entries"], 1)
+        cache.reload()
+        cache.evict()
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+        self.assertEqual(cache.stats()["entries"], 2)
+        self.assertEqual(cache.stats()["bytes"], len("two") + len("three"))
+
+    def test_version_change_misses(self):
+        RenderCache(self.directory, self.render, version="1").render("text")
+        cache = RenderCache(self.directory, self.render, version="2")
+        cache.render("text")
+        self.assertEqual(len(self.renders), 2)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_evicts_least_recently_used_by_entries(self):
+        cache = RenderCache(self.directory, self.render, max_entries=2)
+        cache.render("one")
+        cache.render("two")
+        cache.render("one")
+        cache.render("three")
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertEqual(cache.stats()["entries"], 2)
+        self.assertIsNotNone(cache.get("one"))
+        self.assertIsNone(cache.get("two"))
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+
+    def test_evicts_by_bytes(self):
+        cache = RenderCache(self.directory, self.render, max_bytes=10)
+        cache.render("12345")
+        cache.render("67890")
+        cache.render("abcde")
+        self.assertEqual(cache.stats()["bytes"], 10)
+        self.assertIsNone(cache.get("12345"))
+
+    def test_missing_file_is_a_miss(self):
+        cache = RenderCache(self.directory, self.render)
+        cache.render("text")
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
+        self.assertIsNone(cache.get("text"))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+
+
+class TestMemoCache(unittest.TestCase):
+    def setUp(self):
+        self.renders = []
+
+    def render(self, text):
+        self.renders.append(text)
+        return render_inline(text)
+
+    def test_miss_then_hit(self):
+        memo = MemoCache(self.render)
+        self.assertEqual(memo.render("a [link](/x)"), 'a <a href="/x">link</a>')
+        self.assertEqual(memo.render("a [link](/x)"), 'a <a href="/x">link</a>')
+        self.assertListEqual(["a [link](/x)"], self.renders)
+        self.assertEqual(memo.stats()["hit_rate"], 0.5)
+
+    def test_evicts_least_recently_used_by_entries(self):
+        memo = MemoCache(self.render, max_entries=2)
+        memo.render("one")
+        memo.render("two")
+        memo.render("one")
+        memo.render("three")
+        self.assertListEqual(list(memo.entries), ["one", "three"])
+        self.assertEqual(memo.stats()["evictions"], 1)
+
+    def test_evicts_by_bytes(self):
+        memo = MemoCache(self.render, max_bytes=20)
+        memo.render("**bold**")
+        self.assertEqual(memo.stats()["bytes"], len("**bold**") + len("<b>bold</b>"))
+        memo.render("`x`")
+        self.assertListEqual(list(memo.entries), ["`x`"])
+        self.assertLessEqual(memo.stats()["bytes"], 20)
+
+    def test_sizes_are_utf8_bytes(self):
+        memo = MemoCache(self.render, max_bytes=20)
+        memo.put("café", "<p>café</p>")
+        self.assertEqual(memo.stats()["bytes"], len("café".encode()) + len("<p>café</p>".encode()))
+        memo.put("ü", "ü" * 9)
+        self.assertListEqual(list(memo.entries), ["ü"])
+        self.assertIsNone(memo.get("café"))
+
+    def test_put_replaces_entry(self):
+        memo = MemoCache(self.render)
+        memo.put("a", "<b>a</b>")
+        memo.put("a", "a")
+        self.assertEqual(memo.stats()["bytes"], 2)
+        self.assertEqual(memo.get("a"), "a")
+
+
+if __name__ == "__main__":
+    unittest.main()
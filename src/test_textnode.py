@@ -1,6 +1,8 @@
+import copy
+import pickle
 import unittest
 
-from textnode import TextNode, TextType
+from textnode import FrozenTextNode, TextNode, TextType, intern_text_node
 
 
 class TestTextNode(unittest.TestCase):
@@ -24,10 +26,26 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("This is a text node", TextType.BOLD, "https://github.com/SscottK/static-site-generator")
         self.assertNotEqual(node.url, node2.url)
 
+    def test_not_eq_returns_false(self):
+        node = TextNode("This is a text node", TextType.BOLD)
+        self.assertIs(node == TextNode("Other", TextType.BOLD), False)
+        self.assertIs(node == "This is a text node", False)
+        self.assertIs(node != None, True)
+
+    def test_mutable_node_is_unhashable(self):
+        with self.assertRaises(TypeError):
+            hash(TextNode("This is a text node", TextType.BOLD))
+
     def test_url_is_none(self):
         node = TextNode("This is a text node", TextType.BOLD)
         self.assertIsNone(node.url)
 
+    def test_no_instance_dict(self):
+        node = TextNode("This is a text node", TextType.TEXT)
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.extra = "not allowed"
+
     def test_repr(self):
         node = TextNode("This is a text node", TextType.TEXT, "https://www.boot.dev")
         self.assertEqual(
@@ -35,5 +53,40 @@ class TestTextNode(unittest.TestCase):
         )    
 
 
+
+class TestFrozenTextNode(unittest.TestCase):
+    def test_hashable_and_equal(self):
+        node = FrozenTextNode("link", TextType.LINK, "https://boot.dev")
+        same = FrozenTextNode("link", TextType.LINK, "https://boot.dev")
+        self.assertEqual(node, same)
+        self.assertEqual(hash(node), hash(same))
+        self.assertEqual(node, TextNode("link", TextType.LINK, "https://boot.dev"))
+        self.assertNotEqual(node, FrozenTextNode("link", TextType.LINK, "https://example.com"))
+        self.assertEqual(len({node, same}), 1)
+
+    def test_immutable(self):
+        node = FrozenTextNode("text", TextType.TEXT)
+        with self.assertRaises(AttributeError):
+            node.text = "changed"
+        with self.assertRaises(AttributeError):
+            del node.url
+
+    def test_interning(self):
+        node = intern_text_node("badge", TextType.IMAGE, "/badge.svg")
+        self.assertIs(node, intern_text_node("badge", TextType.IMAGE, "/badge.svg"))
+        self.assertIs(node, TextNode("badge", TextType.IMAGE, "/badge.svg").freeze())
+        self.assertIs(node.freeze(), node)
+        self.assertIsNot(node, intern_text_node("badge", TextType.IMAGE, "/other.svg"))
+
+    def test_repr(self):
+        self.assertEqual(repr(FrozenTextNode("a", TextType.CODE)), "TextNode(a, code, None)")
+
+    def test_copy_and_pickle(self):
+        node = intern_text_node("link", TextType.LINK, "https://boot.dev")
+        self.assertIs(copy.copy(node), node)
+        self.assertIs(copy.deepcopy(node), node)
+        self.assertIs(pickle.loads(pickle.dumps(node)), node)
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,119 @@
+import os
+import tempfile
+import unittest
+
+from htmlnode import chained_text_to_textnodes, split_nodes_delimiter
+from textnode import TextNode, TextType
+from textspans import TextSpans
+
+
+class TestTextSpans(unittest.TestCase):
+    def test_single_text_span(self):
+        spans = TextSpans("Plain text")
+        self.assertEqual(len(spans), 1)
+        self.assertEqual(spans[0], TextNode("Plain text", TextType.TEXT))
+
+    def test_sub_range(self):
+        spans = TextSpans("skip this `code` part", 5, 16)
+        self.assertListEqual(
+            [
+                TextNode("this ", TextType.TEXT),
+                TextNode("code", TextType.CODE),
+                TextNode("", TextType.TEXT),
+            ],
+            spans.split_delimiter("`", TextType.CODE).to_text_nodes(),
+        )
+
+    def test_split_delimiter_matches_nodes(self):
+        text = "Text with `code` and another `code block`"
+        self.assertListEqual(
+            split_nodes_delimiter([TextNode(text, TextType.TEXT)], "`", TextType.CODE),
+            TextSpans(text).split_delimiter("`", TextType.CODE).to_text_nodes(),
+        )
+
+    def test_missing_closing_delimiter(self):
+        with self.assertRaises(ValueError):
+            TextSpans("Text with `code but no closing").split_delimiter("`", TextType.CODE)
+
+    def test_split_links_and_images(self):
+        spans = TextSpans("a ![img](src.png) and [link](https://boot.dev) end")
+        spans = spans.split_images().split_links()
+        self.assertListEqual(
+            [
+                TextNode("a ", TextType.TEXT),
+                TextNode("img", TextType.IMAGE, "src.png"),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("link", TextType.LINK, "https://boot.dev"),
+                TextNode(" end", TextType.TEXT),
+            ],
+            list(spans),
+        )
+        self.assertEqual(spans.url(3), "https://boot.dev")
+        self.assertIsNone(spans.url(0))
+        self.assertEqual(spans[-1], TextNode(" end", TextType.TEXT))
+
+    def test_full_chain_matches_nodes(self):
+        texts = [
+            "This is **text** with an _italic_ word and a `code block` and an"
+            " ![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)",
+            "![image1](url1)![image2](url2)[link1](url1)[link2](url2)",
+            "**bold**`code`_italic_",
+            "No markdown at all",
+            "",
+        ]
+        for text in texts:
+            with self.subTest(text=text):
+                self.assertListEqual(
+                    chained_text_to_textnodes(text),
+                    TextSpans(text).split_inline().to_text_nodes(),
+                )
+
+    def test_index_out_of_range(self):
+        with self.assertRaises(IndexError):
+            TextSpans("text")[1]
+
+
+class TestTextSpansBytes(unittest.TestCase):
+    text = (
+        "Unicode **gr\u00fc\u00dfe** and `c\u00f6de` with an ![\u00e9mage](/\u00e9.png)"
+        " and a [l\u00efnk](https://boot.dev/\u00fc)"
+    )
+
+    def test_bytes_matches_str(self):
+        self.assertListEqual(
+            TextSpans(self.text).split_inline().to_text_nodes(),
+            TextSpans(self.text.encode()).split_inline().to_text_nodes(),
+        )
+
+    def test_nested_brackets_match_nodes(self):
+        text = "[\u00e9[0]](/w/A-(\u00fc)) and [![b](/b.svg)](/ci) ![x](y"
+        expected = chained_text_to_textnodes(text)
+        self.assertListEqual(expected, TextSpans(text).split_inline().to_text_nodes())
+        self.assertListEqual(expected, TextSpans(text.encode()).split_inline().to_text_nodes())
+
+    def test_from_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "page.md")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(self.text)
+            with TextSpans.from_file(path) as spans:
+                self.assertListEqual(
+                    chained_text_to_textnodes(self.text),
+                    spans.split_inline().to_text_nodes(),
+                )
+
+    def test_from_empty_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "empty.md")
+            open(path, "w").close()
+            with TextSpans.from_file(path) as spans:
+                self.assertListEqual([TextNode("", TextType.TEXT)], list(spans))
+
+    def test_missing_closing_delimiter_message(self):
+        with self.assertRaises(ValueError) as context:
+            TextSpans(b"**open").split_delimiter("**", TextType.BOLD)
+        self.assertEqual(str(context.exception), "Closing delimiter not found: **")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+import os
+import shutil
+import tempfile
+import unittest
+import urllib.request
+from unittest import mock
+
+import watch
+from build import build_site
+from test_build import SiteTestCase
+from watch import InotifyWatcher, PollingWatcher, SiteRebuilder, serve
+
+
+class TestWatchers(SiteTestCase):
+    def check_watcher(self, watcher):
+        try:
+            self.assertEqual(watcher.changes(timeout=0.05), set())
+            page = os.path.join(self.content, "index.md")
+            new_page = os.path.join(self.content, "new", "page.md")
+            self.write(page, "# Changed")
+            self.write(new_page, "# New")
+            self.assertEqual(watcher.changes(timeout=2), {page, new_page})
+            os.remove(page)
+            self.write(self.template, "{{ Content }}")
+            self.assertEqual(watcher.changes(timeout=2), {page, self.template})
+        finally:
+            watcher.close()
+
+    def check_moved_directory(self, watcher):
+        try:
+            blog = os.path.join(self.content, "blog")
+            shutil.move(blog, os.path.join(self.temporary_directory.name, "blog"))
+            changed = watcher.changes(timeout=2)
+            # Either the directory or the files that were in it
+            self.assertTrue(changed & {blog, os.path.join(blog, "post.md")})
+        finally:
+            watcher.close()
+
+    def test_polling_watcher_moved_directory(self):
+        self.check_moved_directory(PollingWatcher([self.content], interval=0.01))
+
+    def test_inotify_watcher_moved_directory(self):
+        try:
+            watcher = InotifyWatcher([self.content])
+        except OSError:
+            self.skipTest("inotify is not available")
+        self.check_moved_directory(watcher)
+        self.assertNotIn(os.path.join(self.content, "blog"), watcher.directories.values())
+
+    def test_polling_watcher(self):
+        self.check_watcher(PollingWatcher([self.content, self.template], interval=0.01))
+
+    def test_inotify_watcher(self):
+        try:
+            watcher = InotifyWatcher([self.content, self.template])
+        except OSError:
+            self.skipTest("inotify is not available")
+        self.check_watcher(watcher)
+
+
+class TestSiteRebuilder(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.rebuilder = SiteRebuilder(self.content, self.public, self.template)
+        self.rebuilder.build()
+
+    def assert_matches_full_build(self):
+        with tempfile.TemporaryDirectory() as public:
+            build_site(self.content, public, self.template)
+            for directory, _, files in os.walk(public):
+                for name in files:
+                    if name.endswith(".html"):
+                        path = os.path.join(directory, name)
+                        output = os.path.join(self.public, os.path.relpath(path, public))
+                        self.assertEqual(self.read(output), self.read(path))
+
+    def test_changed_page_rebuilds_only_that_page(self):
+        page = os.path.join(self.content, "index.md")
+        self.write(page, "# Home\n\nWelcome back\n\nTo the **site**")
+        result = self.rebuilder.update({page})
+        self.assertEqual(result, {"built": [os.path.join(self.public, "index.html")], "removed": [], "errors": []})
+        self.assert_matches_full_build()
+
+    def test_page_is_replaced_not_overwritten(self):
+        page = os.path.join(self.content, "index.md")
+        output = os.path.join(self.public, "index.html")
+        previous = self.read(output)
+        # Stands in for the preview server partway through sending the page
+        with open(output, encoding="utf-8") as reader:
+            self.write(page, "# Home\n\nWelcome back")
+            self.rebuilder.update({page})
+            self.assertEqual(reader.read(), previous)
+        self.assertIn("Welcome back", self.read(output))
+        self.assertNotIn("index.html.tmp", os.listdir(self.public))
+
+    def test_unchanged_blocks_are_not_rendered_again(self):
+        page = os.path.join(self.content, "index.md")
+        self.rebuilder.update({page})
+        self.write(page, "# Home\n\nWelcome back\n\nTo the **site**")
+        with mock.patch.object(watch, "block_to_html_node", wraps=watch.block_to_html_node) as render:
+            self.rebuilder.update({page})
+        self.assertEqual(render.call_count, 1)
+        self.assert_matches_full_build()
+
+    def test_template_change_rebuilds_every_page(self):
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        result = self.rebuilder.update({self.template})
+        self.assertEqual(
+            sorted(result["built"]),
+            [os.path.join(self.public, "blog", "post.html"), os.path.join(self.public, "index.html")],
+        )
+        self.assert_matches_full_build()
+
+    def test_new_and_deleted_files(self):
+        new_page = os.path.join(self.content, "new.md")
+        self.write(new_page, "# New")
+        logo = os.path.join(self.content, "logo.png")
+        os.remove(logo)
+        result = self.rebuilder.update({new_page, logo})
+        self.assertEqual(result["built"], [os.path.join(self.public, "new.html")])
+        self.assertEqual(result["removed"], [os.path.join(self.public, "logo.png")])
+        self.assert_matches_full_build()
+
+    def test_render_error_is_reported_and_other_pages_build(self):
+        page = os.path.join(self.content, "index.md")
+        post = os.path.join(self.content, "blog", "post.md")
+        self.write(page, "# Home\n\nA half-typed **bold")
+        self.write(post, "# Post\n\nStill fine")
+        result = self.rebuilder.update({page, post})
+        self.assertEqual(result["built"], [os.path.join(self.public, "blog", "post.html")])
+        self.assertEqual([source for source, _ in result["errors"]], [page])
+        self.assertIsInstance(result["errors"][0][1], ValueError)
+        # Fixing the page rebuilds it
+        self.write(page, "# Home\n\nA **bold** word")
+        self.assertEqual(self.rebuilder.update({page})["errors"], [])
+        self.assert_matches_full_build()
+
+    def test_removed_directory_removes_its_outputs(self):
+        blog = os.path.join(self.content, "blog")
+        self.rebuilder.update({os.path.join(blog, "post.md")})
+        shutil.move(blog, os.path.join(self.temporary_directory.name, "blog"))
+        result = self.rebuilder.update({blog})
+        self.assertEqual(result["removed"], [os.path.join(self.public, "blog", "post.html")])
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+        self.assertEqual(list(self.rebuilder.blocks), [])
+
+    def test_compressed_siblings_are_removed(self):
+        build_site(self.content, self.public, self.template, compress=("gz",))
+        index = os.path.join(self.public, "index.html")
+        post = os.path.join(self.public, "blog", "post.html")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nEdited")
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.rebuilder.update({os.path.join(self.content, "index.md"), os.path.join(self.content, "blog", "post.md")})
+        self.assertTrue(os.path.exists(index))
+        self.assertFalse(os.path.exists(index + ".gz"))
+        self.assertFalse(os.path.exists(post + ".gz"))
+
+    def test_changed_asset_is_copied(self):
+        logo = os.path.join(self.content, "logo.png")
+        self.write(logo, "new bytes")
+        self.rebuilder.update({logo})
+        self.assertEqual(self.read(os.path.join(self.public, "logo.png")), "new bytes")
+
+
+class TestServe(SiteTestCase):
+    def test_serves_directory(self):
+        build_site(self.content, self.public, self.template)
+        server = serve(self.public, port=0)
+        try:
+            url = f"http://127.0.0.1:{server.server_port}/blog/post.html"
+            with urllib.request.urlopen(url) as response:
+                self.assertEqual(response.headers["Cache-Control"], "no-store")
+                self.assertIn("<code>post</code>", response.read().decode())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import weakref
 from enum import Enum
 
 class TextType(Enum):
@@ -9,14 +10,86 @@ class TextType(Enum):
     TEXT = "text"
 
 class TextNode():
+    # Inline parsing creates huge numbers of these, so skip the per-instance dict
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         self.text = text
         self.text_type = text_type
         self.url = url
 
     def __eq__(self, node):
-        if node.text == self.text and node.text_type == self.text_type and node.url == self.url:
-            return True
+        if not isinstance(node, TextNode):
+            return NotImplemented
+        return node.text == self.text and node.text_type == self.text_type and node.url == self.url
+
+    # Mutable, so unhashable; freeze() gives a hashable copy
+    __hash__ = None
+
+    def freeze(self):
+        return intern_text_node(self.text, self.text_type, self.url)
         
     def __repr__(self):
-         return f"TextNode({self.text}, {self.text_type.value}, {self.url})"
\ No newline at end of file
+         return f"TextNode({self.text}, {self.text_type.value}, {self.url})"
+
+
+class FrozenTextNode(TextNode):
+    """
+    An immutable, hashable TextNode. The hash is worked out once, when the
+    node is made, so using it as a dict or set key costs no more than an
+    int. It equals a TextNode with the same fields.
+
+    Get them through intern_text_node (or TextNode.freeze) so identical
+    spans share one node, and with it the LeafNode htmlnode renders it to.
+    """
+    # _leaf is the frozen LeafNode text_node_to_html_node made for it
+    __slots__ = ("_hash", "_leaf", "__weakref__")
+
+    def __init__(self, text, text_type, url=None):
+        object.__setattr__(self, "text", text)
+        object.__setattr__(self, "text_type", text_type)
+        object.__setattr__(self, "url", url)
+        object.__setattr__(self, "_hash", hash((text, text_type, url)))
+        object.__setattr__(self, "_leaf", None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"cannot set {name!r} on a frozen TextNode")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"cannot delete {name!r} from a frozen TextNode")
+
+    def __eq__(self, node):
+        if self is node:
+            return True
+        if isinstance(node, FrozenTextNode) and node._hash != self._hash:
+            return False
+        return super().__eq__(node)
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        # Copies and unpickled nodes go back through the intern table, as
+        # __setattr__ would refuse the default way of restoring slots
+        return intern_text_node, (self.text, self.text_type, self.url)
+
+    def freeze(self):
+        return self
+
+
+# (text, text_type, url) -> the shared FrozenTextNode, kept only while used
+_INTERNED = weakref.WeakValueDictionary()
+
+
+def intern_text_node(text, text_type, url=None):
+    """
+    Returns the one FrozenTextNode for these fields, making it on first use.
+
+    Spans that repeat across pages, like a navigation link or a badge, then
+    share a single node and its rendered HTML for the whole build.
+    """
+    key = (text, text_type, url)
+    node = _INTERNED.get(key)
+    if node is None:
+        node = _INTERNED[key] = FrozenTextNode(text, text_type, url)
+    return node
\ No newline at end of file
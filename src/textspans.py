@@ -0,0 +1,228 @@
+import mmap
+from array import array
+
+from htmlnode import INLINE_DELIMITERS, _find_constructs
+from textnode import TextNode, TextType
+
+# TextTypes are stored as one byte per span
+_TEXT_TYPES = list(TextType)
+TEXT_TYPE_CODES = {text_type: code for code, text_type in enumerate(_TEXT_TYPES)}
+_TEXT = TEXT_TYPE_CODES[TextType.TEXT]
+_NO_URL = -1
+
+
+class TextSpans():
+    """
+    A compact stand-in for a list of TextNodes.
+
+    Spans are kept in parallel arrays pointing into one source string:
+    where each span's text starts and ends, its TextType code and an index
+    into the URL table (-1 when it has none). The URL table holds the start
+    and end of each URL, again as offsets. No text is copied until a
+    TextNode is asked for, by indexing or iterating. Offsets are 32-bit, so
+    the source can be at most 4 GiB.
+
+    The source may also be UTF-8 bytes, or an mmap of a UTF-8 file (see
+    from_file). Offsets are then byte offsets, delimiters and brackets are
+    matched as bytes, and only the text of spans that are asked for is
+    decoded.
+    Every delimiter is ASCII, so no split lands inside a character.
+
+    The split_* methods mirror split_nodes_delimiter, split_nodes_image
+    and split_nodes_link, and each returns a new TextSpans over the same
+    source and URL table.
+
+    Args:
+        source: The markdown text the spans point into.
+        start: Where the initial TEXT span starts.
+        end: Where the initial TEXT span ends; the end of source when None.
+    """
+    __slots__ = ("source", "starts", "ends", "types", "urls", "url_starts", "url_ends")
+
+    def __init__(self, source, start=0, end=None):
+        self.source = source
+        self.starts = array("I", [start])
+        self.ends = array("I", [len(source) if end is None else end])
+        self.types = array("B", [_TEXT])
+        self.urls = array("i", [_NO_URL])
+        self.url_starts = array("I")
+        self.url_ends = array("I")
+
+    def derive(self):
+        # An empty TextSpans sharing this one's source and URL table
+        spans = TextSpans.__new__(TextSpans)
+        spans.source = self.source
+        spans.starts = array("I")
+        spans.ends = array("I")
+        spans.types = array("B")
+        spans.urls = array("i")
+        spans.url_starts = self.url_starts
+        spans.url_ends = self.url_ends
+        return spans
+
+    def __len__(self):
+        return len(self.types)
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Memory-maps a UTF-8 markdown file as a single TEXT span.
+
+        The file is never read into a Python string; close() (or using the
+        result in a with block) releases the mapping.
+        """
+        with open(path, "rb") as file:
+            try:
+                source = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files can't be mapped
+                source = b""
+        return cls(source)
+
+    def close(self):
+        if isinstance(self.source, mmap.mmap):
+            self.source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def decode(self, start, end):
+        text = self.source[start:end]
+        if not isinstance(text, str):
+            text = text.decode("utf-8")
+        return text
+
+    def text(self, index):
+        return self.decode(self.starts[index], self.ends[index])
+
+    def url(self, index):
+        url = self.urls[index]
+        if url == _NO_URL:
+            return None
+        return self.decode(self.url_starts[url], self.url_ends[url])
+
+    def text_type(self, index):
+        return _TEXT_TYPES[self.types[index]]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("span index out of range")
+        return TextNode(self.text(index), self.text_type(index), self.url(index))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield TextNode(self.text(index), self.text_type(index), self.url(index))
+
+    def to_text_nodes(self):
+        return list(self)
+
+    def split_delimiter(self, delimiter, text_type):
+        new_spans = self.derive()
+        add_start = new_spans.starts.append
+        add_end = new_spans.ends.append
+        add_type = new_spans.types.append
+        add_url = new_spans.urls.append
+        find = self.source.find
+        needle = delimiter if isinstance(self.source, str) else delimiter.encode()
+        type_code = TEXT_TYPE_CODES[text_type]
+        delimiter_length = len(needle)
+
+        for start, end, span_type, url in zip(self.starts, self.ends, self.types, self.urls):
+            if span_type != _TEXT:
+                add_start(start)
+                add_end(end)
+                add_type(span_type)
+                add_url(url)
+                continue
+
+            current_index = start
+            while True:
+                start_index = find(needle, current_index, end)
+                if start_index == -1:
+                    break
+                end_index = find(needle, start_index + delimiter_length, end)
+                if end_index == -1:
+                    raise ValueError(f"Closing delimiter not found: {delimiter}")
+                if start_index > current_index:
+                    add_start(current_index)
+                    add_end(start_index)
+                    add_type(_TEXT)
+                    add_url(_NO_URL)
+                add_start(start_index + delimiter_length)
+                add_end(end_index)
+                add_type(type_code)
+                add_url(_NO_URL)
+                current_index = end_index + delimiter_length
+
+            # Like split_nodes_delimiter, keep the remainder even when empty
+            add_start(current_index)
+            add_end(end)
+            add_type(_TEXT)
+            add_url(_NO_URL)
+
+        return new_spans
+
+    def split_images(self):
+        return self._split_brackets(True, TEXT_TYPE_CODES[TextType.IMAGE])
+
+    def split_links(self):
+        return self._split_brackets(False, TEXT_TYPE_CODES[TextType.LINK])
+
+    def split_inline(self):
+        """
+        Runs every inline stage: each delimiter in INLINE_DELIMITERS, then
+        images, then links.
+        """
+        spans = self
+        for delimiter, text_type in INLINE_DELIMITERS.items():
+            spans = spans.split_delimiter(delimiter, text_type)
+        return spans.split_images().split_links()
+
+    def _split_brackets(self, images, type_code):
+        new_spans = self.derive()
+        add_start = new_spans.starts.append
+        add_end = new_spans.ends.append
+        add_type = new_spans.types.append
+        add_url = new_spans.urls.append
+        add_url_start = self.url_starts.append
+        add_url_end = self.url_ends.append
+        source = self.source
+
+        for start, end, span_type, url in zip(self.starts, self.ends, self.types, self.urls):
+            if span_type != _TEXT:
+                add_start(start)
+                add_end(end)
+                add_type(span_type)
+                add_url(url)
+                continue
+
+            current_index = start
+            found = _find_constructs(source, images, start, end)
+            for match_start, match_end, text_start, text_end, url_start, url_end in found:
+                if match_start > current_index:
+                    add_start(current_index)
+                    add_end(match_start)
+                    add_type(_TEXT)
+                    add_url(_NO_URL)
+                add_start(text_start)
+                add_end(text_end)
+                add_type(type_code)
+                add_url(len(self.url_starts))
+                add_url_start(url_start)
+                add_url_end(url_end)
+                current_index = match_end
+
+            # Keep the span itself when nothing matched, otherwise only a
+            # non-empty remainder, like split_nodes_image and split_nodes_link
+            if current_index == start or current_index < end:
+                add_start(current_index)
+                add_end(end)
+                add_type(_TEXT)
+                add_url(_NO_URL)
+
+        return new_spans
@@ -0,0 +1,420 @@
+import ctypes
+import ctypes.util
+import functools
+import http.server
+import os
+import select
+import shutil
+import struct
+import threading
+import time
+
+from blocks import block_to_html_node, iter_blocks
+from build import DEFAULT_TEMPLATE, build_site, extract_title, find_content
+from compressed import remove_siblings
+from htmlnode import render_html
+
+# inotify event bits, from <sys/inotify.h>
+_IN_MODIFY = 0x2
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+
+# struct inotify_event: wd, mask, cookie and the length of the name after it
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class PollingWatcher():
+    """
+    Finds changed files by comparing the mtime and size of everything under
+    a set of directories and files every interval seconds.
+
+    Works anywhere, at the cost of a stat per file per poll.
+
+    Args:
+        paths: Directories to watch recursively, and single files.
+        interval: Seconds between polls.
+    """
+
+    def __init__(self, paths, interval=0.1):
+        self.paths = [path for path in paths if path]
+        self.interval = interval
+        self.state = self.snapshot()
+
+    def snapshot(self):
+        state = {}
+        for path in self.paths:
+            if os.path.isdir(path):
+                for directory, _, files in os.walk(path):
+                    for name in files:
+                        self.stat(os.path.join(directory, name), state)
+            else:
+                self.stat(path, state)
+        return state
+
+    def stat(self, path, state):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return
+        state[path] = (stat.st_mtime_ns, stat.st_size)
+
+    def changes(self, timeout=None):
+        """
+        Waits until files change, or timeout seconds pass.
+
+        Returns:
+            The set of paths created, modified or deleted since the last
+            call, which is empty on a timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            state = self.snapshot()
+            changed = {path for path in state.keys() | self.state.keys() if state.get(path) != self.state.get(path)}
+            self.state = state
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self.interval)
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher():
+    """
+    Finds changed files through Linux inotify, called through ctypes so no
+    extra package is needed. Changes are reported as the kernel sees them,
+    with no scanning.
+
+    Raises OSError where inotify isn't available.
+
+    Args:
+        paths: Directories to watch recursively, and single files.
+        settle: Seconds to keep collecting events after the first one, so
+            an editor's write, rename and chmod arrive as one change.
+    """
+
+    def __init__(self, paths, settle=0.01):
+        self.settle = settle
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.libc = libc
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # Watch descriptor -> directory it watches
+        self.directories = {}
+        # Single files are watched through their directory
+        self.files = set()
+        self.roots = set()
+        for path in paths:
+            if not path:
+                continue
+            if os.path.isdir(path):
+                self.roots.add(path)
+                self.add_tree(path)
+            else:
+                self.files.add(path)
+                self.add_directory(os.path.dirname(path) or ".")
+
+    def add_directory(self, directory):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed: {directory}")
+        self.directories[wd] = directory
+
+    def add_tree(self, root):
+        for directory, _, _ in os.walk(root):
+            self.add_directory(directory)
+
+    def remove_tree(self, root):
+        # A moved directory keeps its watches, which would report its files
+        # under their old paths
+        prefix = root.rstrip(os.sep) + os.sep
+        for wd, directory in list(self.directories.items()):
+            if directory == root or directory.startswith(prefix):
+                # Fails harmlessly when the kernel already dropped it
+                self.libc.inotify_rm_watch(self.fd, wd)
+                del self.directories[wd]
+
+    def wanted(self, path):
+        return path in self.files or any(
+            path == root or path.startswith(root.rstrip(os.sep) + os.sep) for root in self.roots
+        )
+
+    def read_events(self):
+        changed = set()
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            directory = self.directories.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & _IN_ISDIR:
+                if not self.wanted(path):
+                    continue
+                # A new directory may already hold files by the time it's watched
+                if mask & (_IN_CREATE | _IN_MOVED_TO):
+                    self.add_tree(path)
+                    for subdirectory, _, files in os.walk(path):
+                        changed.update(os.path.join(subdirectory, file) for file in files)
+                # A directory that's gone is reported itself; what was in it
+                # is no longer there to list
+                if mask & (_IN_MOVED_FROM | _IN_DELETE):
+                    self.remove_tree(path)
+                    changed.add(path)
+                continue
+            if self.wanted(path):
+                changed.add(path)
+        return changed
+
+    def changes(self, timeout=None):
+        """
+        Waits until files change, or timeout seconds pass.
+
+        Returns:
+            The set of paths created, modified or deleted, which is empty on
+            a timeout.
+        """
+        changed = set()
+        while True:
+            ready, _, _ = select.select([self.fd], [], [], timeout)
+            if not ready:
+                return changed
+            changed |= self.read_events()
+            if changed:
+                # Only the quiet period after the first event is waited for
+                timeout = self.settle
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def open_watcher(paths, polling=False):
+    """
+    Returns an InotifyWatcher for paths, or a PollingWatcher when polling
+    is True or inotify can't be used.
+    """
+    if not polling:
+        try:
+            return InotifyWatcher(paths)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(paths)
+
+
+class SiteRebuilder():
+    """
+    Keeps a site up to date as its files change, holding what it needs to
+    rebuild a page in memory: the template and the rendered HTML of every
+    block of each page it has rebuilt. A changed page only has its changed
+    blocks rendered again and a changed template reuses the content of the
+    pages already held, so saving a page costs that one page whatever the
+    size of the site.
+
+    Args:
+        content_dir: Directory of markdown pages and assets.
+        dest_dir: Directory the site is written to.
+        template_path: HTML template, or None for the built-in one.
+    """
+
+    def __init__(self, content_dir, dest_dir, template_path=None):
+        self.content_dir = content_dir
+        self.dest_dir = dest_dir
+        self.template_path = template_path
+        self.template = self.read_template()
+        # Source path -> {block lines: rendered HTML}
+        self.blocks = {}
+        # Source path -> (title, content HTML)
+        self.contents = {}
+
+    def read_template(self):
+        if not self.template_path:
+            return DEFAULT_TEMPLATE
+        with open(self.template_path, encoding="utf-8") as file:
+            return file.read()
+
+    def build(self, **options):
+        # The first build is an ordinary incremental one
+        return build_site(self.content_dir, self.dest_dir, self.template_path, **options)
+
+    def output_path(self, source):
+        relative = os.path.relpath(source, self.content_dir)
+        if relative.endswith(".md"):
+            relative = relative[:-3] + ".html"
+        return os.path.normpath(os.path.join(self.dest_dir, relative))
+
+    def render_content(self, source, lines):
+        # Renders each block, reusing the HTML of blocks that didn't change
+        previous = self.blocks.get(source, {})
+        blocks = {}
+        parts = ["<div>"]
+        for block_type, block in iter_blocks(lines):
+            key = tuple(block)
+            html = previous.get(key)
+            if html is None:
+                html = blocks.get(key) or render_html(block_to_html_node(block_type, block))
+            blocks[key] = html
+            parts.append(html)
+        parts.append("</div>")
+        self.blocks[source] = blocks
+        return "".join(parts)
+
+    def write_page(self, source):
+        output = self.output_path(source)
+        if source not in self.contents:
+            # Split like a streamed build, which iterates the file's lines
+            with open(source, encoding="utf-8") as file:
+                lines = file.readlines()
+            default_title = os.path.splitext(os.path.basename(source))[0]
+            title = extract_title(lines) or default_title
+            self.contents[source] = (title, self.render_content(source, lines))
+        title, content = self.contents[source]
+        html = self.template.replace("{{ Title }}", title).replace("{{ Content }}", content)
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        # The preview server may be sending the old page, so the new one
+        # replaces it whole rather than being written over it
+        temporary_path = f"{output}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            file.write(html)
+        os.replace(temporary_path, output)
+        # Pages are written uncompressed, so siblings from a compressed
+        # build would go stale
+        remove_siblings(output)
+        return output
+
+    def update(self, paths):
+        """
+        Rebuilds what depends on the changed paths: a page for its source,
+        an asset's copy, or every page for the template.
+
+        Returns:
+            A dict listing the outputs that were built and removed, and
+            the (source, exception) pairs of pages that failed to render.
+        """
+        built = []
+        removed = []
+        pages = set()
+        content_root = os.path.normpath(self.content_dir) + os.sep
+        for path in paths:
+            if self.template_path and os.path.normpath(path) == os.path.normpath(self.template_path):
+                self.template = self.read_template()
+                pages.update(source for source, _ in find_content(self.content_dir, self.dest_dir)[0])
+                continue
+            if not os.path.normpath(path).startswith(content_root):
+                continue
+            output = self.output_path(path)
+            self.contents.pop(path, None)
+            if not os.path.exists(path):
+                removed.extend(self.remove_outputs(path))
+            elif path.endswith(".md"):
+                pages.add(path)
+            else:
+                os.makedirs(os.path.dirname(output), exist_ok=True)
+                shutil.copyfile(path, output)
+                built.append(output)
+        errors = []
+        for source in sorted(pages):
+            if not os.path.exists(source):
+                continue
+            try:
+                built.append(self.write_page(source))
+            except Exception as error:
+                # A half-typed page mustn't stop the others, or the watch
+                errors.append((source, error))
+        return {"built": built, "removed": removed, "errors": errors}
+
+    def remove_outputs(self, path):
+        # Removes the output of a deleted file, or everything under a
+        # deleted directory's output directory
+        prefix = path.rstrip(os.sep) + os.sep
+        for source in [source for source in self.blocks if source == path or source.startswith(prefix)]:
+            del self.blocks[source]
+        for source in [source for source in self.contents if source.startswith(prefix)]:
+            del self.contents[source]
+        output = self.output_path(path)
+        removed = []
+        if os.path.isdir(output):
+            for directory, _, files in os.walk(output):
+                removed.extend(os.path.join(directory, name) for name in files)
+            shutil.rmtree(output)
+        elif os.path.exists(output):
+            os.remove(output)
+            remove_siblings(output)
+            removed.append(output)
+        return removed
+
+
+class _PreviewHandler(http.server.SimpleHTTPRequestHandler):
+    def end_headers(self):
+        # Always fetch the latest build
+        self.send_header("Cache-Control", "no-store")
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(directory, port=8000, host="127.0.0.1"):
+    """
+    Serves directory over HTTP on a background thread.
+
+    Returns:
+        The server; call shutdown() on it to stop.
+    """
+    handler = functools.partial(_PreviewHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def watch(content_dir, dest_dir, template_path=None, port=8000, polling=False, log=print):
+    """
+    Builds the site, serves it for preview and rebuilds on every change
+    until interrupted.
+    """
+    rebuilder = SiteRebuilder(content_dir, dest_dir, template_path)
+    result = rebuilder.build()
+    log(f"Built {len(result['built'])}, {result['skipped']} up to date")
+    server = serve(dest_dir, port)
+    watcher = open_watcher([content_dir, template_path], polling)
+    log(f"Watching {content_dir} with {type(watcher).__name__}, preview at http://127.0.0.1:{server.server_port}/")
+    try:
+        while True:
+            changed = watcher.changes()
+            start = time.perf_counter()
+            try:
+                result = rebuilder.update(changed)
+            except Exception as error:
+                # Such as an unreadable template; the next save may fix it
+                log(f"Rebuild failed: {error}")
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            for source, error in result["errors"]:
+                log(f"Error in {source}: {error}")
+            if result["built"] or result["removed"]:
+                log(f"Rebuilt {len(result['built'])}, removed {len(result['removed'])} in {elapsed:.1f} ms")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        server.shutdown()